@@ -0,0 +1,153 @@
+"""
+This file implements a single entry point for the end-to-end latency analysis of LET cause-effect chains.
+The chain is classified once based on its periods (max-harmonic, (2,k)-max-harmonic or general), and the
+cheapest exact analysis that is applicable is selected based on a cost estimate:
+- Closed-form latency bound of the optimal phasing (Theorem 10, Eq. 34), if the chain uses it
+- DPT analysis (DPT_Offset.py)
+- Analysis by Martinez et al. TCAD'18, scalar or batched with NumPy (MartinezTCAD18.py)
+- Offset heuristic by Martinez et al. TCAD'18 (only to find the optimal phasing of general chains)
+
+* analyzeChain(chain, metric)   -> Latency of the chain ("latency") or latency under the optimal phasing ("optimalLatency"),
+                                   the chain is not changed
+* selectEngine(chain, metric)   -> Name of the analysis analyzeChain uses
+"""
+from Time import *
+from Task import *
+from Comparison import davareBound
+from DPT_Offset import DPT
+from OptimalPhasing import *
+from MartinezTCAD18 import calculateLatencyMartinezTCAD18, calculateLatencyMartinezTCAD18Vectorized, getHeuristicOffsets
+import os
+
+"""
+Cost model of the analyses in microseconds, fitted to measured runtimes of synchronous random chains
+(lengths 2-12, periods 1 ms - 1 s). Only the relative cost matters for the selection.
+- DPT: proportional to the number of jobs within the hyperperiod plus the Davare bound
+- Martinez: proportional to the number of reading points at the end of the chain times the chain length
+"""
+COST_DPT_JOB = 0.7
+COST_DPT_TASK = 13
+COST_DPT = 250
+COST_MARTINEZ_STEP = 1.3
+COST_MARTINEZ = 30
+COST_MARTINEZ_VECTORIZED_STEP = 0.02
+COST_MARTINEZ_VECTORIZED_TASK = 17
+COST_MARTINEZ_VECTORIZED = 5
+
+def classifyChain(chain):
+    """ Returns "maxHarmonic", "2kMaxHarmonic" or "general" depending on the periods of the chain. """
+    if isMaxHarmonic(chain):
+        return "maxHarmonic"
+    if is2kMaxHarmonic(chain):
+        return "2kMaxHarmonic"
+    return "general"
+
+def getClosedFormPhasing(chain, chainType):
+    """ Returns the offsets and the latency bound of the optimal phasing for the type of chain, or None if there is no closed form.
+        The chain is not changed. """
+    if chainType == "maxHarmonic":
+        return getOptimalOffsetsMaxHarm(chain)
+    if chainType == "2kMaxHarmonic":
+        return getOptimalOffsets2kMaxHarm(chain)
+    return None
+
+def estimateCost(chain, engine):
+    """ Returns the estimated runtime of the analysis of the chain with the engine (in microseconds). """
+    hp = hyperperiod(chain)
+
+    if engine == "dpt":
+        jobs = sum((hp + davareBound(chain)) / task.period for task in chain)
+        return COST_DPT_JOB * jobs + COST_DPT_TASK * len(chain) + COST_DPT
+
+    readingPoints = hp / max(chain[len(chain)-1].period, chain[len(chain)-2].period)
+
+    if engine == "martinez":
+        return COST_MARTINEZ_STEP * readingPoints * len(chain) + COST_MARTINEZ
+
+    assert engine == "martinezVectorized", "Unknown engine: " + str(engine)
+    return COST_MARTINEZ_VECTORIZED_STEP * readingPoints * len(chain) + COST_MARTINEZ_VECTORIZED_TASK * len(chain) + COST_MARTINEZ_VECTORIZED
+
+def selectEngine(chain, metric="latency"):
+    """ Returns the analysis that analyzeChain uses for the chain and metric:
+        "closedForm", "dpt", "martinez", "martinezVectorized" or "heuristic". """
+    return chooseEngine(chain, metric, getClosedFormPhasing(chain, classifyChain(chain)))
+
+def chooseEngine(chain, metric, closedForm):
+    """ Implements selectEngine, closedForm are the offsets and the latency bound of the optimal phasing (or None). """
+    if metric == "optimalLatency":
+        if closedForm is not None:
+            return "closedForm"
+        return "heuristic"
+
+    assert metric == "latency", "Unknown metric: " + str(metric)
+
+    if closedForm is not None and getOffsets(chain) == closedForm[0]:
+        return "closedForm"     # The chain uses the optimal phasing, its latency is the latency bound
+
+    # The analysis of Martinez et al. is only used for synchronous chains,
+    # for other offsets the DPT analysis is the reference
+    if len(chain) < 2 or any(task.offset != 0 for task in chain):
+        return "dpt"
+
+    return min(["dpt", "martinez", "martinezVectorized"], key=lambda engine: estimateCost(chain, engine))
+
+def analyzeChain(chain, metric="latency", offsetGranularity=mseconds(1)):
+    """ Returns the end-to-end latency (maximum data age) of the chain with the cheapest exact analysis.
+        - metric "latency": latency with the current offsets of the chain
+        - metric "optimalLatency": latency under the optimal phasing. For general chains, the optimal offsets are 
+          found by the offset heuristic with offsetGranularity.
+        The chain is not changed, so one chain can be analyzed by several threads at the same time.
+    """
+    closedForm = getClosedFormPhasing(chain, classifyChain(chain))    # Used for the selection and the analysis
+    engine = chooseEngine(chain, metric, closedForm)
+
+    if engine == "closedForm":
+        offsets, latencyBound = closedForm
+        return latencyBound
+
+    if engine == "heuristic":
+        latency, offsets, timedOut = getHeuristicOffsets(chain, offsetGranularity, prune=True)
+        return latency
+
+    if engine == "martinez":
+        return calculateLatencyMartinezTCAD18(chain)
+
+    if engine == "martinezVectorized":
+        return calculateLatencyMartinezTCAD18Vectorized(chain)
+
+    return DPT(chain).getMaxAge()
+
+if __name__ == '__main__':
+    """ Debugging """
+    os.system('cls' if os.name == 'nt' else 'clear')    # Clear the terminal
+
+    # Case Study - Harmonic (see MartinezTCAD18.py)
+    task1 = Task('Task1', useconds(1), mseconds(10), mseconds(10), 0)
+    task2 = Task('Task2', useconds(1), mseconds(50), mseconds(50), 0)
+    task3 = Task('Task3', useconds(1), mseconds(10), mseconds(10), 0)
+    task4 = Task('Task4', useconds(1), mseconds(50), mseconds(50), 0)
+
+    chain = [task1, task2, task3, task4]
+
+    print(chainString(chain) + " (" + classifyChain(chain) + ")")
+
+    latency = analyzeChain(chain)
+    print("Synchronous latency: " + printTime(latency) + " (" + selectEngine(chain) + ")")
+    assert latency == DPT(chain).getMaxAge()
+
+    optimalLatency = analyzeChain(chain, "optimalLatency")
+    print("Optimal latency: " + printTime(optimalLatency) + " (" + selectEngine(chain, "optimalLatency") + ")")
+    assert getOffsets(chain) == [0, 0, 0, 0]
+
+    # With the offsets of the optimal phasing, the latency is known without analysis
+    offsets, latencyBound = getOptimalOffsetsMaxHarm(chain)
+    phasedChain = withOffsets(chain, offsets)
+    assert selectEngine(phasedChain) == "closedForm"
+    assert analyzeChain(phasedChain) == optimalLatency == DPT(phasedChain).getMaxAge()
+
+    # General chain, the optimal phasing is found by the offset heuristic
+    chain = [Task('Task1', useconds(1), mseconds(20), mseconds(20), 0), Task('Task2', useconds(1), mseconds(50), mseconds(50), 0), 
+             Task('Task3', useconds(1), mseconds(30), mseconds(30), 0)]
+    optimalLatency = analyzeChain(chain, "optimalLatency")
+    print("Optimal latency: " + printTime(optimalLatency) + " (" + selectEngine(chain, "optimalLatency") + ")")
+    assert getOffsets(chain) == [0, 0, 0] and optimalLatency <= analyzeChain(chain)
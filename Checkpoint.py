@@ -0,0 +1,121 @@
+"""
+This file implements checkpoints for the results of the synthetic experiments. For the results of each chain length,
+a JSON file next to them (length_N.checkpoint) records:
+- the configuration of the experiment (seed, period model, ...). A resumed experiment must use the same configuration.
+- the number of chains with results (chains 1 to completed), i.e., the number of complete rows of the result columns
+- aggregates of the finished chains: number of chains, sum, minimum and maximum of the ratio between the latency
+  with optimal phasing and with synchronous release
+Since each chain is generated from its own random stream (see generateChains in Task.py), the configuration and the
+number of completed chains are enough to continue at the first missing chain, without generating the finished chains.
+Rows that are written after the last checkpoint (e.g., half-written rows when the experiment was stopped) are 
+removed from the result columns and analyzed again.
+
+* Checkpoint(resultPath, config)            -> Restores the checkpoint of binary results and repairs the result columns
+* checkpoint.add(records)                   -> Adds records that were appended to the results
+* checkpoint.save()                         -> Stores the checkpoint (atomically)
+"""
+from Results import readResultFile, truncateResults, getSchemaPath
+import numpy as np
+import json
+import os
+
+class Checkpoint:
+    """ Class to represent the checkpoint of the results of one chain length. """
+
+    def __init__(self, resultPath, config):
+        self.resultPath = resultPath                    # Binary results with one row per chain (see Results.py)
+        self.path = resultPath + ".checkpoint"          # JSON-file of the checkpoint
+        self.config = config                            # Configuration of the experiment (JSON serializable)
+
+        self.completed = 0                              # Chains 1 to completed have results (rows 0 to completed-1)
+
+        self.count = 0                                  # Aggregates of the ratio latency optimal phasing / synchronous release
+        self.ratioSum = 0.0
+        self.bestRatio = None
+        self.worstRatio = None
+
+        self.restore()
+
+    def restore(self):
+        """ Restores the checkpoint and truncates the result columns to the rows of the completed chains.
+            Results without checkpoint are read once, and only rows that are in all columns are kept. """
+        if not os.path.isfile(getSchemaPath(self.resultPath)):
+            return                                      # No results yet (an old checkpoint is overwritten on the next save)
+
+        if os.path.isfile(self.path):
+            with open(self.path) as file:
+                data = json.load(file)
+
+            assert data["config"] == self.config, "The results in " + self.resultPath + " are from another configuration: " + str(data["config"])
+            self.completed = data["completed"]
+            self.count = data["count"]
+            self.ratioSum = data["ratioSum"]
+            self.bestRatio = data["bestRatio"]
+            self.worstRatio = data["worstRatio"]
+        else:
+            columns = readResultFile(self.resultPath)  # Without partially written rows at the end
+            self.add(columns)
+            del columns                                 # Close the memory-maps before the files are truncated
+
+        truncateResults(self.resultPath, self.completed)
+
+        self.save()
+
+    def add(self, records):
+        """ Adds the records (or columns) of the next chains, after they are appended to the results. """
+        if len(records["index"]) > 0:
+            ratios = records["optPhasingLatency"] / records["synchronousLatency"]
+
+            self.count += len(ratios)
+            self.ratioSum += float(np.sum(ratios))
+
+            if self.bestRatio is None or np.min(ratios) < self.bestRatio:
+                self.bestRatio = float(np.min(ratios))
+
+            if self.worstRatio is None or np.max(ratios) > self.worstRatio:
+                self.worstRatio = float(np.max(ratios))
+
+        self.completed += len(records["index"])
+
+    def save(self):
+        """ Stores the checkpoint. It is written to a temporary file first, so the checkpoint is never partially written. """
+        data = {"config": self.config, "completed": self.completed, "count": self.count,
+                "ratioSum": self.ratioSum, "bestRatio": self.bestRatio, "worstRatio": self.worstRatio}
+
+        tmpPath = self.path + ".tmp"
+        with open(tmpPath, "w") as file:
+            json.dump(data, file)
+        os.replace(tmpPath, self.path)
+
+    def averageRatio(self):
+        """ Returns the average ratio latency optimal phasing / synchronous release of the completed chains. """
+        if self.count == 0:
+            return None
+        return self.ratioSum / self.count
+
+if __name__ == '__main__':
+    """ Debugging """
+    from Results import ResultWriter, getColumnPath, readColumnCount
+    import tempfile
+
+    resultPath = os.path.join(tempfile.mkdtemp(), "length_2")
+    config = {"seed": 123, "length": 2}
+
+    writer = ResultWriter(resultPath)
+    for i, (sync, opt) in enumerate([(1.0, 0.5), (2.0, 1.0), (2.0, 2.0)], 1):
+        writer.append((i, sync, 0.1, opt, 0.1, opt, 0.1, 2.0, 0.1, sync, 0.1, opt, 0.1, -1, -1, 1, True, -1, 0, 0, -1))
+    writer.close()
+
+    with open(getColumnPath(resultPath, "index"), "ab") as file:
+        file.write(b"partial")                                              # The last row is only partially written
+
+    checkpoint = Checkpoint(resultPath, config)
+    print("Completed: " + str(checkpoint.completed) + " Average Ratio: " + str(checkpoint.averageRatio()))
+    assert checkpoint.completed == 3 and checkpoint.worstRatio == 1.0
+
+    writer = ResultWriter(resultPath)
+    writer.append((4, 2.0, 0.1, 1.0, 0.1, 1.0, 0.1, 2.0, 0.1, 2.0, 0.1, 1.0, 0.1, -1, -1, 2**70 + 1, True, -1, 0, 0, -1))
+    writer.close()                                                          # Stopped before the next checkpoint
+
+    checkpoint = Checkpoint(resultPath, config)
+    assert checkpoint.completed == 3 and readColumnCount(getColumnPath(resultPath, "combinations")) == 3
@@ -35,6 +35,13 @@ def randomPhasing(chain, seed):
 
         predecessor = task
 
+def getRandomOffsets(chain, seed):
+    """ Returns the offsets of randomPhasing, without changing the chain. """
+    phasedChain = withOffsets(chain, getOffsets(chain))
+    randomPhasing(phasedChain, seed)
+
+    return getOffsets(phasedChain)
+
 if __name__ == "__main__":
     """ Debugging """
     os.system('cls' if os.name == 'nt' else 'clear')    # Clear the terminal
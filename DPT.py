@@ -18,6 +18,7 @@ class DPT:
         self.maxAge = None  # Maximum data age of the chain
         self.dpts = {}      # Data propagation tree (for each initial/root job)
         self.jobs = []      # All possible jobs that can be in the DPT (except the root jobs)
+        self.criticalBranch = None  # Jobs of the branch that experiences the maximum data age
 
         print("Chain: ")
         for t in self.chain:
@@ -40,8 +41,11 @@ class DPT:
 
         return davare
 
-    def getDpt(self):
-        """ Returns the data propagation tree for all root jobs. """
+    def getDpt(self, fullTree=True):
+        """ Returns the data propagation tree for all root jobs. 
+            If fullTree is False, no graphs are constructed and the returned dict stays empty. Only the maximum 
+            data age and the branch that leads to it (criticalBranch) are kept.
+        """
 
         rootJobs = self.getRootJobs()
 
@@ -51,10 +55,7 @@ class DPT:
         maxTime = self.davareBound() + rootJobs[-1].release    # The last root job experiences the max data age
         
         for t in self.chain[1:]:
-            tmpJobs = []
-            for j in t.getJobsUntil(maxTime):
-                tmpJobs.append(DptJob(j))
-            self.jobs.append(tmpJobs)
+            self.jobs.append(t.getJobsUntil(maxTime))
 
         #for j in self.jobs:
         #    for k in j:
@@ -63,22 +64,27 @@ class DPT:
         # Construct the DPT for each root job
         for r in rootJobs:
             root = DptJob(r)                                        # Create the root job
-            self.dpts[root] = nx.DiGraph()                          # Add the new graph to the dict with the root job as key
-            self.dpts[root].add_node(root)                          # Add the root job to the graph
-            dpt = self.recursiveDptBuild(self.dpts[root], root)     # Recursively construct the graph
+            graph = None
+            if fullTree:
+                graph = nx.DiGraph()                                # Create a new graph for the root job
+                graph.add_node(root)                                # Add the root job to the graph
+                self.dpts[root] = graph                             # Add the new graph to the dict with the root job as key
+            self.recursiveDptBuild(graph, root, [root])             # Recursively construct the graph
 
         return self.dpts
      
-    def recursiveDptBuild(self, graph, vertex):
-        """ Recursively computes the data propagation tree. """
+    def recursiveDptBuild(self, graph, vertex, branch):
+        """ Recursively computes the data propagation tree. The branch contains all vertices from the root job to vertex. 
+            If graph is None, the tree is only traversed. """
         
         # Check if the end of the chain is reached
-        if self.chain.index(vertex.job.task) == len(self.chain) - 1:
-            root = list(self.dpts.keys())[list(self.dpts.values()).index(graph)]    # Get the root node of this DPT    
+        if len(branch) == len(self.chain):
+            root = branch[0]                                                        # Get the root node of this DPT    
             vertex.branchAge = vertex.ri[1] + vertex.job.task.wcet - root.ri[0]     # Set the data age of this branch
 
             if self.maxAge is None or self.maxAge < vertex.branchAge:
                 self.maxAge = vertex.branchAge
+                self.criticalBranch = [node.job for node in branch]
 
             self.printNode(vertex)           # Print helper to plot the DPT in the terminal
         else:
@@ -93,24 +99,26 @@ class DPT:
                     successor.di[0] = successor.ri[0] + successor.job.task.wcet
                 
                 # Append job to graph
-                graph.add_node(successor)            # Add the next node to the graph
-                graph.add_edge(vertex, successor)    # Add the edge to the new node
+                if graph is not None:
+                    graph.add_node(successor)            # Add the next node to the graph
+                    graph.add_edge(vertex, successor)    # Add the edge to the new node
 
                 # Build next edge by recursively calling recursiveDptBuild()
-                self.recursiveDptBuild(graph, successor)
-                
-                # Reset intervals of the job (as it might be used in other branches of the DPT)
-                successor.resetIntervals()
+                branch.append(successor)
+                self.recursiveDptBuild(graph, successor, branch)
+                branch.pop()
 
     def getSuccessors(self, writeJob):
         """ Returns the list of possible successor jobs """
-        successors = []
         index = self.chain.index(writeJob.job.task)
+        readTask = self.chain[index + 1]
         taskJobs = self.jobs[index] # We are interested in jobs of the next task in the chain. This is never called for the last task in the chain
 
-        for readJob in taskJobs:
-            if readJob.ri[1] >= writeJob.di[0] and readJob.ri[0] < writeJob.di[1]:  # Eq. 1 Becker RTCSA'16
-                successors.append(readJob)
+        # Eq. 1 Becker RTCSA'16: readJob.ri[1] >= writeJob.di[0] and readJob.ri[0] < writeJob.di[1]
+        # The read interval is [r, r + D - C], i.e. successors are released in [writeJob.di[0] - (D - C), writeJob.di[1])
+        successors = []
+        for readJob in taskJobs.window(writeJob.di[0] - (readTask.deadline - readTask.wcet), writeJob.di[1]):
+            successors.append(DptJob(readJob))
 
         return successors
 
@@ -10,6 +10,9 @@ In addition:
   value is present at the end of the chain (i.e. before it gets overwritten).
 - Offsets are accounted for.
 - LET semantics are used for communication.
+- The maximum data age can be computed on a DAG of merged DPT vertices (getMaxAge), 
+  without constructing the complete tree for each root job.
+- getMaxAgeDpt(chain, offsets) computes the maximum data age for given offsets without changing the chain.
  
 Assumptions: 
 - Periodic tasks with implicit deadlines and offset.
@@ -28,6 +31,7 @@ class DPT:
         self.maxAge = None  # Maximum data age of the chain
         self.dpts = {}      # Data propagation tree (for each initial/root job)
         self.jobs = []      # All possible jobs that can be in the DPT (except the root jobs)
+        self.criticalBranch = None  # Jobs of the branch that experiences the maximum data age
         self.dbg = False    # Flag to print debug information
 
         if self.dbg:
@@ -52,42 +56,105 @@ class DPT:
 
         return davare
 
-    def getDpt(self):
-        """ Returns the data propagation tree for all root jobs. """
+    def createJobs(self, rootJobs):
+        """ Creates the list of jobs that must be considered for the analysis. """
 
-        rootJobs = self.getRootJobs()
-
-        # Create the list of jobs that must be considered for the analysis
         # The maximum time to consider can be upper bounded by the Davare bound and the release of the last 
         # root job (i.e. the last root job experiences the max data age).
         maxTime = self.davareBound() + rootJobs[-1].release    # The last root job experiences the max data age
         
+        self.jobs = []
         for t in self.chain[1:]:
-            tmpJobs = []
-            for j in t.getJobsUntil(maxTime):
-                tmpJobs.append(DptJob(j))
-            self.jobs.append(tmpJobs)
+            self.jobs.append(t.getJobsUntil(maxTime))
+
+    def getDpt(self, fullTree=True):
+        """ Returns the data propagation tree for all root jobs. 
+            If fullTree is False, no graphs are constructed and the returned dict stays empty. Only the maximum 
+            data age and the branch that leads to it (criticalBranch) are kept.
+        """
+
+        rootJobs = self.getRootJobs()
+
+        self.createJobs(rootJobs)
 
         # Construct the DPT for each root job
         for r in rootJobs:
             root = DptJob(r)                                        # Create the root job
-            self.dpts[root] = nx.DiGraph()                          # Add the new graph to the dict with the root job as key
-            self.dpts[root].add_node(root)                          # Add the root job to the graph
-            dpt = self.recursiveDptBuild(self.dpts[root], root)     # Recursively construct the graph
+            graph = None
+            if fullTree:
+                graph = nx.DiGraph()                                # Create a new graph for the root job
+                graph.add_node(root)                                # Add the root job to the graph
+                self.dpts[root] = graph                             # Add the new graph to the dict with the root job as key
+            self.recursiveDptBuild(graph, root, [root])             # Recursively construct the graph
 
         return self.dpts
      
-    def recursiveDptBuild(self, graph, vertex):
-        """ Recursively computes the data propagation tree. """
+    def getMaxAge(self):
+        """ Returns the maximum data age without constructing the data propagation trees. 
+            Vertices of the DPTs that belong to the same job and have the same (adjusted) start of the read interval 
+            have identical sub-trees. They are merged into a directed acyclic graph, and the latest end of the data 
+            interval at the end of the chain that can be reached from each vertex is computed only once.
+        """
+
+        rootJobs = self.getRootJobs()
+
+        self.createJobs(rootJobs)
+
+        latestDataEnds = {}     # Memoized results of latestDataEnd() for each (chain position, job id, ri[0])
+
+        for r in rootJobs:
+            root = DptJob(r)
+            end = self.latestDataEnd(root, 0, latestDataEnds)
+
+            if end is not None:
+                age = end - root.ri[0]      # Data age of the oldest branch of this root job
+
+                if self.maxAge is None or self.maxAge < age:
+                    self.maxAge = age
+
+        return self.maxAge
+
+    def latestDataEnd(self, vertex, pos, latestDataEnds):
+        """ Returns the latest end of the data interval of a job of the last task that can be reached from vertex. 
+            None is returned if no job of the last task can be reached. """
+
+        # Check if the end of the chain is reached
+        if pos == len(self.chain) - 1:
+            return vertex.di[1]
+
+        key = (pos, vertex.job.id, vertex.ri[0])
+        if key in latestDataEnds:
+            return latestDataEnds[key]
+
+        latest = None
+
+        for successor in self.getSuccessors(vertex):
+            if successor.ri[0] < vertex.di[0]:  # If the read interval of the successor starts before the data is first available, move it (only for this branch)
+                successor.ri[0] = vertex.di[0]
+                successor.di[0] = successor.ri[0] + successor.job.task.wcet
+
+            end = self.latestDataEnd(successor, pos + 1, latestDataEnds)
+
+            if end is not None and (latest is None or latest < end):
+                latest = end
+
+        latestDataEnds[key] = latest
+
+        return latest
+
+    def recursiveDptBuild(self, graph, vertex, branch):
+        """ Recursively computes the data propagation tree. The branch contains all vertices from the root job to vertex. 
+            If graph is None, the tree is only traversed. """
         
         # Check if the end of the chain is reached
-        if self.chain.index(vertex.job.task) == len(self.chain) - 1:
-            root = list(self.dpts.keys())[list(self.dpts.values()).index(graph)]    # Get the root node of this DPT    
+        if len(branch) == len(self.chain):
+            root = branch[0]                                                        # Get the root node of this DPT    
             #vertex.branchAge = vertex.ri[1] + vertex.job.task.wcet - root.ri[0]     # Set the data age of this branch
             vertex.branchAge = vertex.di[1] - root.ri[0]                            # Set the data age of this branch. Data age is counted from initial sampling until the value at the end of the job is overwritten.
 
             if self.maxAge is None or self.maxAge < vertex.branchAge:
                 self.maxAge = vertex.branchAge
+                self.criticalBranch = [node.job for node in branch]
 
             if self.dbg:
                 self.printNode(vertex)           # Print helper to plot the DPT in the terminal
@@ -104,25 +171,26 @@ class DPT:
                     successor.di[0] = successor.ri[0] + successor.job.task.wcet
                 
                 # Append job to graph
-                graph.add_node(successor)            # Add the next node to the graph
-                graph.add_edge(vertex, successor)    # Add the edge to the new node
+                if graph is not None:
+                    graph.add_node(successor)            # Add the next node to the graph
+                    graph.add_edge(vertex, successor)    # Add the edge to the new node
 
                 # Build next edge by recursively calling recursiveDptBuild()
-                self.recursiveDptBuild(graph, successor)
-                
-                # Reset intervals of the job (as it might be used in other branches of the DPT)
-                successor.resetIntervals()
+                branch.append(successor)
+                self.recursiveDptBuild(graph, successor, branch)
+                branch.pop()
 
     def getSuccessors(self, writeJob):
         """ Returns the list of possible successor jobs """
-        successors = []
         index = self.chain.index(writeJob.job.task)
         taskJobs = self.jobs[index] # We are interested in jobs of the next task in the chain. This is never called for the last task in the chain
 
-        for readJob in taskJobs:
-            if readJob.ri[1] >= writeJob.di[0] and readJob.ri[0] < writeJob.di[1]:  # Eq. 1 Becker RTCSA'16
-                successors.append(readJob)
-        
+        # Eq. 1 Becker RTCSA'16: readJob.ri[1] >= writeJob.di[0] and readJob.ri[0] < writeJob.di[1]
+        # With LET semantics the read interval is [r, r], i.e. successors are released in [writeJob.di[0], writeJob.di[1])
+        successors = []
+        for readJob in taskJobs.window(writeJob.di[0], writeJob.di[1]):
+            successors.append(DptJob(readJob))
+
         return successors
 
     def printNode(self, node):
@@ -158,6 +226,10 @@ class DptJob:
 
     __repr__ = __str__
 
+def getMaxAgeDpt(chain, offsets):
+    """ Returns the maximum data age of the chain with the given offsets. The chain is not changed. """
+    return DPT(withOffsets(chain, offsets)).getMaxAge()
+
 if __name__ == '__main__':
     """ Debugging """
     os.system('cls' if os.name == 'nt' else 'clear')    # Clear the terminal
@@ -7,20 +7,26 @@ Communication Delays With Logical Execution Time," in IEEE Transactions on Compu
 Design of Integrated Circuits and Systems, vol. 37, no. 11, pp. 2244-2254, 2018.
 
 * Latency analysis: calculateLatencyMartinezTCAD18(chain)
-* Offset heuristic: heuristicOptimalPhasing(chain, offsetGranularity)
+* Latency analysis for given offsets (the chain is not changed): calculateLatencyMartinezTCAD18Offsets(chain, offsets)
+* Batched latency analysis with NumPy: calculateLatencyMartinezTCAD18Vectorized(chain)
+* Incremental latency analysis for changing offsets: MartinezLatencyEvaluator(chain).latency()
+* Reading and publishing points of a task pair: getCommunicationTable(wTask, rTask)
+* Offset heuristic: heuristicOptimalPhasing(chain, offsetGranularity, prune)
+* Offset heuristic that returns the offsets (the chain is not changed): getHeuristicOffsets(chain, offsetGranularity, prune, timeout_s)
+* Parallel offset heuristic: heuristicOptimalPhasingParallel(chain, offsetGranularity, processes, splitDepth, prune)
+* Anytime offset heuristic with progress reports: heuristicOptimalPhasingAnytime(chain, offsetGranularity, callback, interval, prune, timeout_s)
 """
 from Time import *
 from Task import *
 from Comparison import davareBound
 from DPT_Offset import DPT
 from OptimalPhasing import *
-import networkx as nx
+import numpy as np
+import multiprocessing
+import functools
 import math
 import os
 from timeit import default_timer as timer
-import threading
-import sys
-import time
 
 def calculateLatencyMartinezTCAD18(chain):
 
@@ -37,16 +43,20 @@ def calculateLatencyMartinezTCAD18(chain):
         if task.offset > maxOffset:
             maxOffset = task.offset
 
+    table = getCommunicationTable(secondLast, last)    # Reading and publishing points of the last two tasks
+
+    # Reading points are strictly increasing in n, so the first and last index within 
+    # [worstCaseLatency + maxOffset, worstCaseLatency + hp + maxOffset] can be computed directly
+    firstN = table.readingPointIndex(worstCaseLatency + maxOffset)
+    lastN = table.readingPointIndex(worstCaseLatency + hp + maxOffset)
+    if table.readingPoint(lastN) > worstCaseLatency + hp + maxOffset:
+        lastN = lastN - 1
+
     readingPoints = []
     rp_n = []
-    tmpRp = 0
-    n = 0
-    while tmpRp < worstCaseLatency + hp + maxOffset:
-        tmpRp = getReadingPoint(secondLast, last, n)
-        n = n + 1
-        if  worstCaseLatency + maxOffset <= tmpRp <= worstCaseLatency + hp + maxOffset:
-            readingPoints.append(tmpRp)
-            rp_n.append(n-1)
+    for n in range(firstN, lastN + 1):
+        readingPoints.append(table.readingPoint(n))
+        rp_n.append(n)
 
     # Calculate the corresponding start of the basic path using Algorithm 1
     initialPublishingPoints = []
@@ -61,7 +71,7 @@ def calculateLatencyMartinezTCAD18(chain):
     latency = []
     for i in range(len(readingPoints)-1, -1, -1):
         if i == len(readingPoints) - 1 or readingPoints[i] != readingPoints[i-1]:   # Filter out basic paths we don't need to consider
-            nextRp = getReadingPoint(secondLast, last, rp_n[i] + 1) # get the next reading point at the end of the chain
+            nextRp = table.readingPoint(rp_n[i] + 1)    # get the next reading point at the end of the chain
             #print("Basic Path: PP = " + printTime(initialPublishingPoints[i]) + " RP = " + printTime(readingPoints[i]) + " next RP = " + printTime(nextRp))
             latency.append(getBasicPathEtoE(chain, initialPublishingPoints[i],readingPoints[i], nextRp))
 
@@ -69,6 +79,51 @@ def calculateLatencyMartinezTCAD18(chain):
 
     return maxLatency
 
+def calculateLatencyMartinezTCAD18Offsets(chain, offsets):
+    """ Returns the latency of the chain with the given offsets. The chain is not changed. """
+    return calculateLatencyMartinezTCAD18(withOffsets(chain, offsets))
+
+def calculateLatencyMartinezTCAD18Vectorized(chain):
+    """ Batched version of calculateLatencyMartinezTCAD18(chain) that returns the same latency. 
+        All reading points of one hyperperiod are generated as one NumPy array, and the backward walk 
+        of Algorithm 1 is applied to all of them stage by stage. 
+    """
+    last = chain[len(chain)-1]
+    secondLast = chain[len(chain)-2]
+    worstCaseLatency = davareBound(chain)
+    hp = hyperperiod(chain)
+
+    maxOffset = 0
+    for task in chain:
+        if task.offset > maxOffset:
+            maxOffset = task.offset
+
+    # Indices of all reading points in [worstCaseLatency + maxOffset, worstCaseLatency + hp + maxOffset]
+    firstN = getReadingPointIndex(secondLast, last, worstCaseLatency + maxOffset)
+    lastN = getReadingPointIndex(secondLast, last, worstCaseLatency + hp + maxOffset)
+    if getReadingPoint(secondLast, last, lastN) > worstCaseLatency + hp + maxOffset:
+        lastN = lastN - 1
+
+    rp_n = np.arange(firstN, lastN + 1, dtype=np.int64)
+    readingPoints = getReadingPoint(secondLast, last, rp_n)
+    nextReadingPoints = getReadingPoint(secondLast, last, rp_n + 1)
+
+    # Algorithm 1 for all reading points. Line 1 is not needed, since the index of each reading point is known.
+    pp = getPublishingPoint(secondLast, last, rp_n)
+    for i in range(len(chain), 2, -1):
+        writer = chain[i-3] # get i-2
+        reader = chain[i-2] # get i-1
+
+        # Find the largest Q^{x_i-1}_{i-2, i-1} < Q^{x_i}_{i-1, i}
+        tmp_n = getReadingPointIndex(writer, reader, pp) - 1
+        pp = getPublishingPoint(writer, reader, tmp_n)
+
+    # Equation 5 for all basic paths (see getBasicPathEtoE). Reading points are strictly increasing, 
+    # so no basic path is filtered out.
+    latency = chain[0].period + (readingPoints - pp) + (nextReadingPoints - readingPoints) + chain[len(chain)-1].period
+
+    return int(latency.max())
+
 def calcStartOfBP(chain, rp):
     """ Algorithm 1 """
 
@@ -76,12 +131,11 @@ def calcStartOfBP(chain, rp):
     last = chain[len(chain)-1]  # get n
     secondLast = chain[len(chain)-2] # get n-1
 
-    n = 0
-    while getReadingPoint(secondLast, last, n) < rp:
-        n = n + 1
+    table = getCommunicationTable(secondLast, last)
+    n = table.readingPointIndex(rp)
 
     # Line 2: Compute P^{x_n}_{n-1, n}
-    pp = getPublishingPoint(secondLast, last, n)    # P^{x_n}_{n-1, n}
+    pp = table.publishingPoint(n)    # P^{x_n}_{n-1, n}
     #print("\tPublishing Point: x_" + str(len(chain)) + " = " + str(n) + " at time: " + printTime(pp))
     
     # Lines 4-6: 
@@ -89,18 +143,102 @@ def calcStartOfBP(chain, rp):
         writer = chain[i-3] # get i-2
         reader = chain[i-2] # get i-1
 
-        # Find the largest Q^{x_i-1}_{i-2, i-1} < Q^{x_i}_{i-1, i}
-        tmp_n = 0
-        while getReadingPoint(writer, reader, tmp_n) < pp:
-            #print("\tReading Point: x_" + str(i-1) + " = " + str(tmp_n) + " at time: " + printTime(getReadingPoint(writer, reader, tmp_n)) + " < " + printTime(pp))
-            tmp_n = tmp_n + 1
-        
-        tmp_n = tmp_n - 1
-        #print("\tReading Point: x_" + str(i-1) + " = " + str(tmp_n) + " at time: " + printTime(getReadingPoint(writer, reader, tmp_n)))
-        pp = getPublishingPoint(writer, reader, tmp_n)
-        #print("\tPublishing Point: x_" + str(i-1) + " = " + str(tmp_n) + " at time: " + printTime(pp))
+        # Find the largest Q^{x_i-1}_{i-2, i-1} < Q^{x_i}_{i-1, i} and its publishing point
+        pp = getCommunicationTable(writer, reader).previousPublishingPoint(pp)
+        #print("\tPublishing Point: x_" + str(i-1) + " at time: " + printTime(pp))
     return pp
 
+""" Number of reading points between two checks whether the analysis of MartinezLatencyEvaluator is stopped. """
+STOP_CHECK_INTERVAL = 1024
+
+class MartinezLatencyEvaluator:
+    """ Incremental version of calculateLatencyMartinezTCAD18 for a chain whose offsets change between the analyses (e.g., in the 
+        offset heuristic). The periods of the chain must not change.
+        The backward walk of Algorithm 1 over the writer/reader pairs j, ..., 0 only depends on the offsets of the tasks 0, ..., j+1. 
+        Its result is memoized for each pair j and publishing point, and only the memos of the pairs that contain a changed 
+        offset are discarded. If only the offsets at the end of the chain change, most walks end after one or two pairs. 
+        For chains with a long hyperperiod one analysis can take long, so isStopped (if set) is checked every STOP_CHECK_INTERVAL 
+        reading points, and the analysis is aborted if it returns True. """
+
+    def __init__(self, chain, isStopped=None):
+        self.chain = chain
+        self.isStopped = isStopped                  # Called during the analysis, returns True to abort it
+        self.worstCaseLatency = davareBound(chain)  # Only depends on the periods
+        self.hp = hyperperiod(chain)
+        self.offsets = None                         # Offsets of the previous analysis
+        self.tables = [None] * max(0, len(chain) - 1)   # tables[j]: communication table of the pair (j, j+1)
+        self.startOfBP = [dict() for _ in range(max(0, len(chain) - 2))]  # startOfBP[j][pp]: start of the basic path from the publishing point pp of the pair (j+1, j+2)
+
+    def update(self):
+        """ Discards the memos that depend on offsets that changed since the previous analysis. """
+        offsets = [task.offset for task in self.chain]
+
+        changed = 0
+        if self.offsets is not None:
+            changed = next((i for i in range(len(offsets)) if offsets[i] != self.offsets[i]), len(offsets))
+            for j in range(max(0, changed - 1), len(self.startOfBP)):
+                self.startOfBP[j].clear()
+
+        for j in range(max(0, changed - 1), len(self.tables)):
+            self.tables[j] = getCommunicationTable(self.chain[j], self.chain[j+1])
+
+        self.offsets = offsets
+
+    def getStartOfBP(self, pp):
+        """ Lines 4-6 of Algorithm 1 for the publishing point pp of the last two tasks of the chain. """
+        visited = []    # Memos and publishing points of the walk that are not memoized yet
+
+        j = len(self.chain) - 3
+        while j >= 0:
+            memo = self.startOfBP[j]
+            if pp in memo:
+                pp = memo[pp]
+                break
+
+            visited.append((memo, pp))
+
+            # Find the largest Q^{x_i-1}_{i-2, i-1} < Q^{x_i}_{i-1, i} and its publishing point
+            pp = self.tables[j].previousPublishingPoint(pp)
+            j -= 1
+
+        for memo, publishingPoint in visited:
+            memo[publishingPoint] = pp
+
+        return pp
+
+    def latency(self):
+        """ Returns the same latency as calculateLatencyMartinezTCAD18 for the current offsets of the chain, or None if 
+            the analysis was aborted by isStopped. """
+        if len(self.chain) < 2:
+            return calculateLatencyMartinezTCAD18(self.chain)   # No task pair to memoize
+
+        self.update()
+
+        chain = self.chain
+        table = self.tables[len(chain)-2]   # Communication of the last two tasks
+        maxOffset = max(self.offsets)
+
+        firstN = table.readingPointIndex(self.worstCaseLatency + maxOffset)
+        lastN = table.readingPointIndex(self.worstCaseLatency + self.hp + maxOffset)
+        if table.readingPoint(lastN) > self.worstCaseLatency + self.hp + maxOffset:
+            lastN = lastN - 1
+
+        # Reading points are strictly increasing, so no basic path is filtered out
+        maxLatency = None
+        for n in range(firstN, lastN + 1):
+            if self.isStopped is not None and (n - firstN + 1) % STOP_CHECK_INTERVAL == 0 and self.isStopped():
+                return None
+
+            pp = self.getStartOfBP(table.publishingPoint(n))
+            nextRp = table.readingPoint(n + 1)
+
+            # Equation 5 (see getBasicPathEtoE)
+            latency = chain[0].period + (nextRp - pp) + chain[len(chain)-1].period
+            if maxLatency is None or latency > maxLatency:
+                maxLatency = latency
+
+        return maxLatency
+
 def getBasicPathEtoE(chain, publishingPoint, readingPoint, nextReadingPoint):
     """ Equation 5"""
     
@@ -119,19 +257,107 @@ def getBasicPathEtoE(chain, publishingPoint, readingPoint, nextReadingPoint):
     return latency
 
 def getReadingPoint(wTask, rTask, n):
-    """ Equation 4 """
+    """ Equation 4. Single points are looked up in the communication table of the task pair, for a NumPy array of indices 
+        the equation is evaluated for all of them at once. """
+    if not isinstance(n, np.ndarray):
+        return getCommunicationTable(wTask, rTask).readingPoint(n)
 
-    rp = rTask.offset + math.ceil((n * max(rTask.period, wTask.period) + max(rTask.offset, wTask.offset) - rTask.offset) / rTask.period) * rTask.period
+    # ceil(x / T) is computed as -(-x // T), so n can also be a NumPy array of indices
+    rp = rTask.offset + -(-(n * max(rTask.period, wTask.period) + max(rTask.offset, wTask.offset) - rTask.offset) // rTask.period) * rTask.period
 
     return rp
 
+def getReadingPointIndex(wTask, rTask, time):
+    """ Inverse of Equation 4: Returns the smallest n >= 0 with getReadingPoint(wTask, rTask, n) >= time. 
+        time can also be a NumPy array, then an array of indices is returned. """
+    if not isinstance(time, np.ndarray):
+        return getCommunicationTable(wTask, rTask).readingPointIndex(time)
+
+    maxPeriod = max(rTask.period, wTask.period)
+    shift = max(rTask.offset, wTask.offset) - rTask.offset
+
+    # getReadingPoint(n) >= time <=> ceil((n * maxPeriod + shift) / rTask.period) >= k <=> n * maxPeriod + shift > (k - 1) * rTask.period
+    k = -((rTask.offset - time) // rTask.period)     # ceil((time - rTask.offset) / rTask.period)
+    n = ((k - 1) * rTask.period - shift) // maxPeriod + 1
+
+    return np.maximum(n, 0)
+
 def getPublishingPoint(wTask, rTask, n):
-    """ Equation 3 """
+    """ Equation 3. Single points are looked up in the communication table of the task pair (see getReadingPoint). """
+    if not isinstance(n, np.ndarray):
+        return getCommunicationTable(wTask, rTask).publishingPoint(n)
 
-    pp = wTask.offset + math.floor((n * max(rTask.period, wTask.period) + max(rTask.offset, wTask.offset) - wTask.offset) / wTask.period) * wTask.period
+    # floor(x / T) is computed as x // T, so n can also be a NumPy array of indices
+    pp = wTask.offset + ((n * max(rTask.period, wTask.period) + max(rTask.offset, wTask.offset) - wTask.offset) // wTask.period) * wTask.period
 
     return pp
 
+""" Largest number of reading and publishing points that are stored for one task pair, and number of task pairs that are cached. """
+MAX_TABLE_PERIOD = 1024
+MAX_CACHED_TABLES = 4096
+
+class CommunicationTable:
+    """ Reading points (Equation 4) and publishing points (Equation 3) of the communication between a writer and a reader task. 
+        Both are periodic in n: after p = lcm(wPeriod, rPeriod) / max(wPeriod, rPeriod) communications, the pattern repeats 
+        shifted by lcm(wPeriod, rPeriod). One period of the points is precomputed, so any n is answered by a table lookup. 
+        If p is larger than MAX_TABLE_PERIOD, the points are computed with Equations 3 and 4 instead. """
+
+    def __init__(self, wPeriod, wOffset, rPeriod, rOffset):
+        self.wPeriod = wPeriod
+        self.wOffset = wOffset
+        self.rPeriod = rPeriod
+        self.rOffset = rOffset
+        self.maxPeriod = max(wPeriod, rPeriod)
+        self.shift = max(wOffset, rOffset)
+        self.lcm = math.lcm(wPeriod, rPeriod)   # Shift of the points after one period of the table
+        self.period = self.lcm // self.maxPeriod  # Number of communications until the pattern repeats
+
+        self.readingPoints = None
+        self.publishingPoints = None
+        if self.period <= MAX_TABLE_PERIOD:
+            self.readingPoints = [self.calcReadingPoint(n) for n in range(self.period)]
+            self.publishingPoints = [self.calcPublishingPoint(n) for n in range(self.period)]
+
+    def calcReadingPoint(self, n):
+        """ Equation 4 """
+        return self.rOffset + -(-(n * self.maxPeriod + self.shift - self.rOffset) // self.rPeriod) * self.rPeriod
+
+    def calcPublishingPoint(self, n):
+        """ Equation 3 """
+        return self.wOffset + ((n * self.maxPeriod + self.shift - self.wOffset) // self.wPeriod) * self.wPeriod
+
+    def readingPoint(self, n):
+        """ Same as getReadingPoint(wTask, rTask, n) """
+        if self.readingPoints is None:
+            return self.calcReadingPoint(n)
+        k, i = divmod(n, self.period)
+        return self.readingPoints[i] + k * self.lcm
+
+    def publishingPoint(self, n):
+        """ Same as getPublishingPoint(wTask, rTask, n) """
+        if self.publishingPoints is None:
+            return self.calcPublishingPoint(n)
+        k, i = divmod(n, self.period)
+        return self.publishingPoints[i] + k * self.lcm
+
+    def readingPointIndex(self, time):
+        """ Same as getReadingPointIndex(wTask, rTask, time) """
+        k = -((self.rOffset - time) // self.rPeriod)
+        n = ((k - 1) * self.rPeriod - self.shift + self.rOffset) // self.maxPeriod + 1
+        return max(0, n)
+
+    def previousPublishingPoint(self, time):
+        """ Publishing point that belongs to the largest reading point < time, i.e., one step of Lines 4-6 of Algorithm 1. """
+        return self.publishingPoint(self.readingPointIndex(time) - 1)
+
+@functools.lru_cache(maxsize=MAX_CACHED_TABLES)
+def getCommunicationTableCached(wPeriod, wOffset, rPeriod, rOffset):
+    return CommunicationTable(wPeriod, wOffset, rPeriod, rOffset)
+
+def getCommunicationTable(wTask, rTask):
+    """ Returns the (cached) communication table of the writer and reader task. """
+    return getCommunicationTableCached(wTask.period, wTask.offset, rTask.period, rTask.offset)
+
 def combinationsHeuristic(chain, offsetGranularity):
     """ This function computes the number of latency computations required to find the optimal 
         offset according to the offset assignment heuristic of:
@@ -178,57 +404,246 @@ def combinationsHeuristic(chain, offsetGranularity):
 
     return combinationsIndividual 
 
-class OffsetNode:
-    """ This is a helper class we use as vertex in the tree to represent all offset combinations. """
-    def __init__(self, task_id, offset):
-        self.task_id = task_id
-        self.offset = offset
+def getEndNodeCounts(chain, offsetGranularity):
+    """ Returns for each depth i of the offset tree the number of end nodes below a vertex, i.e., the number of offset assignments 
+        of the tasks i, ..., n-1 that are explored. Since the offsets 0, ..., gcd are enumerated for each task, 
+        endNodes[1] (the complete search) is slightly larger than the value of combinationsHeuristic. """
+    endNodes = [1] * (len(chain) + 1)
+    rangeBounds = [1] * len(chain)
 
-def heuristicOptimalPhasing(chain, offsetGranularity):
+    prevLcm = int(chain[0].period / offsetGranularity)
+    for pos in range(1, len(chain)):
+        period = int(chain[pos].period / offsetGranularity)
+        rangeBounds[pos] = math.gcd(period, prevLcm) + 1
+        prevLcm = math.lcm(period, prevLcm)
+
+    for pos in range(len(chain) - 1, -1, -1):
+        endNodes[pos] = endNodes[pos+1] * rangeBounds[pos]
+
+    return endNodes
+
+def latencyLowerBound(chain):
+    """ Lower bound on the end-to-end latency of the chain under any phasing: the sum of all periods plus the largest period. 
+        Each job needs one period (LET) before its data is available to the next task, and the data of the task with 
+        the largest period stays valid for another period at the end of the chain (see Theorem 10). """
+    return sum(task.period for task in chain) + getMaxPeriod(chain)
+
+def getIncumbentLatency(chain):
+    """ Returns the latency of the chain under the optimal phasing for max-harmonic or (2,k)-max-harmonic periods,
+        or None if the periods are neither. The chain is not changed. """
+    if isMaxHarmonic(chain):
+        offsets, latencyBound = getOptimalOffsetsMaxHarm(chain)
+    elif is2kMaxHarmonic(chain):
+        offsets, latencyBound = getOptimalOffsets2kMaxHarm(chain)
+    else:
+        return None
+
+    return calculateLatencyMartinezTCAD18Offsets(chain, offsets)
+
+class HeuristicProgress:
+    """ Snapshot of the offset heuristic that is passed to the callback of heuristicOptimalPhasingAnytime. """
+    def __init__(self, explored, total, bestLatency, bestOffsets, lowerBound, duration):
+        self.explored = explored            # Number of end nodes that were analyzed or pruned
+        self.total = total                  # Number of end nodes of the offset tree
+        self.bestLatency = bestLatency      # Smallest latency found so far (None if no end node was analyzed yet)
+        self.bestOffsets = bestOffsets      # Task offsets that lead to the smallest latency found so far
+        self.lowerBound = lowerBound        # Lower bound on the latency of any offset assignment
+        self.duration = duration            # Time since the start of the search (in seconds)
+
+    def gap(self):
+        """ Returns the relative gap between the best latency and the lower bound (an upper bound on the distance to the optimum), or None. """
+        if self.bestLatency is None:
+            return None
+        return (self.bestLatency - self.lowerBound) / self.lowerBound
+
+    def __str__(self):
+        gap = self.gap()
+        return "Explored %s/%s (%.1f%%), best latency: %s, gap: %s, time: %.1fs" % (self.explored, self.total, 100 * self.explored / self.total,
+            "-" if self.bestLatency is None else printTime(self.bestLatency), "-" if gap is None else "%.1f%%" % (100 * gap), self.duration)
+
+class HeuristicState:
+    """ This is a helper class that keeps track of the offset heuristic while the tree of all offset combinations is explored. """
+    def __init__(self, chain, offsetGranularity, prune=False, deadline=None):
+        self.offsets = [0] * len(chain)     # Offsets (in multiples of the offset granularity) on the path from the root to the current vertex
+        self.bestLatency = None             # Smallest latency found so far
+        self.bestOffsets = None             # Offsets that lead to the smallest latency found so far
+        self.prune = prune                  # Cut sub-trees that cannot contain a better offset assignment
+        self.incumbentLatency = None        # Latency of a known phasing, used to prune before the first end node is analyzed
+        self.lowerBound = latencyLowerBound(chain)  # Lower bound on the latency of any offset assignment
+        self.sharedBest = None              # Smallest latency found by any worker process of the parallel heuristic and its partition (multiprocessing.Array)
+        self.partition = 0                  # Index of the explored partition in depth first order (parallel heuristic)
+        self.deadline = deadline            # Point in time (timer()) when the search is stopped, None to search the complete tree
+        self.timedOut = False               # Set once the deadline has passed
+        self.offsetGranularity = offsetGranularity
+        self.endNodes = getEndNodeCounts(chain, offsetGranularity)  # endNodes[i] is the number of end nodes below a vertex at depth i
+        self.explored = 0                   # Number of end nodes that were analyzed or pruned
+        self.callback = None                # Called with a HeuristicProgress every interval seconds, the search stops if it returns True
+        self.interval = 0                   # Time between two progress reports (in seconds)
+        self.start = timer()                # Start of the search
+        self.nextReport = None              # Point in time (timer()) of the next progress report
+        self.stopped = False                # Set once the callback stopped the search
+
+        # suffixPeriods[i] is the sum of the periods of the tasks i, ..., n-1
+        self.suffixPeriods = [0] * (len(chain) + 1)
+        for i in range(len(chain) - 1, -1, -1):
+            self.suffixPeriods[i] = self.suffixPeriods[i+1] + chain[i].period
+
+        self.evaluator = MartinezLatencyEvaluator(chain, self.isStopped)   # Analysis of the end nodes, consecutive end nodes only differ in the last offsets
+
+    def isImprovement(self, latency):
+        """ Returns true if the latency is smaller than the smallest one found so far. Before the first improvement is found,
+            latencies up to the incumbent latency are accepted, so the result is the same as without an incumbent. """
+        if self.bestLatency is None:
+            return self.incumbentLatency is None or latency <= self.incumbentLatency
+        return latency < self.bestLatency
+
+    def isPruned(self, bound):
+        """ Returns true if no offset assignment with a latency of at least bound can be an improvement. """
+        if not self.prune:
+            return False
+        if self.sharedBest is not None:
+            with self.sharedBest.get_lock():
+                sharedLatency, sharedPartition = self.sharedBest[0], self.sharedBest[1]
+            # An equal latency is only an improvement if it belongs to an earlier partition
+            if bound > sharedLatency or (bound == sharedLatency and sharedPartition < self.partition):
+                return True
+        if self.bestLatency is None:
+            return self.incumbentLatency is not None and bound > self.incumbentLatency
+        return bound >= self.bestLatency
+
+    def isStopped(self):
+        """ Returns true if the search is stopped, either because the deadline has passed or by the progress callback. 
+            Progress is reported if it is due. """
+        if self.timedOut or self.stopped:
+            return True
+
+        if self.deadline is None and self.callback is None:
+            return False
+
+        now = timer()
+        if self.deadline is not None and now > self.deadline:
+            self.timedOut = True
+        elif self.callback is not None and now >= self.nextReport:
+            self.report()
+
+        return self.timedOut or self.stopped
+
+    def report(self):
+        """ Passes the current progress to the callback. """
+        if self.callback(self.getProgress()):
+            self.stopped = True
+        self.nextReport = timer() + self.interval
+
+    def getProgress(self):
+        """ Returns the current progress of the search. """
+        bestOffsets = None
+        if self.bestOffsets is not None:
+            bestOffsets = [offset * self.offsetGranularity for offset in self.bestOffsets]
+
+        return HeuristicProgress(self.explored, self.endNodes[1], self.bestLatency, bestOffsets, self.lowerBound, timer() - self.start)
+
+    def setCallback(self, callback, interval):
+        """ Reports the progress to callback every interval seconds. """
+        self.callback = callback
+        self.interval = interval
+        self.nextReport = timer() + interval
+
+    def setBest(self, latency):
+        """ Stores the current offsets as the best offset assignment. """
+        self.bestLatency = latency
+        self.bestOffsets = list(self.offsets)     # Only copy the offsets when a better assignment is found
+
+        if self.sharedBest is not None:
+            with self.sharedBest.get_lock():
+                if latency < self.sharedBest[0] or (latency == self.sharedBest[0] and self.partition < self.sharedBest[1]):
+                    self.sharedBest[0] = latency
+                    self.sharedBest[1] = self.partition
+
+def heuristicOptimalPhasing(chain, offsetGranularity, prune=False):
     """ Implements Algorithm 2 to identify the optimal phasing, considering the complete depth of the chain. 
-        This is implemented by building a tree where each level represents a task in the chain (starting from task 0) and a distinct offset assignment.
+        The offset combinations form a tree where each level represents a task in the chain (starting from task 0) and a distinct offset assignment.
         We then have to check the latency for each path from the root node to leafe nodes. 
-        Once an end node is reached, the latency of the chain is analyzed. The smallest latency and related leafe node is returned. That way we can then
-        reconstruct the offset assignment without the need to search the tree again. """
+        The tree is explored depth first and only the offsets of the current path are kept. Once an end node is reached, the latency of the 
+        chain is analyzed, and the offsets are copied if the latency is the smallest one found so far. That way the memory stays linear in the 
+        length of the chain, and the offset assignment is known without the need to search the tree again. 
+        
+        If prune is set, the search is done as branch-and-bound. For max-harmonic and (2,k)-max-harmonic chains, the latency of the optimal 
+        phasing is used as incumbent, and sub-trees whose lower bound on the latency cannot improve on the best latency are not explored. 
+        The latency and offsets are the same as with the exhaustive search. """
+
+    return searchOptimalPhasing(chain, offsetGranularity, prune).bestLatency
+
+def searchOptimalPhasing(chain, offsetGranularity, prune=False, deadline=None, callback=None, interval=0):
+    """ Explores the offset tree (see heuristicOptimalPhasing) until it is complete, the deadline (timer()) has passed or the callback 
+        stopped it. The best offsets found are assigned to the chain, and the state of the search is returned. """
 
     for task in chain:
         assert task.period % offsetGranularity == 0
 
-    graph = nx.DiGraph()
-    
-    rootCase = OffsetNode(0,0)
-    graph.add_node(rootCase)            # task 0 has always offset 0
+    initialOffsets = [task.offset for task in chain]
+
+    state = HeuristicState(chain, offsetGranularity, prune, deadline)   # task 0 has always offset 0
+    state.setCallback(callback, interval)
+    if prune:
+        state.incumbentLatency = getIncumbentLatency(chain)
     prevLcm = int(chain[0].period / offsetGranularity)
 
-    ret = createCombinationsRec(chain, 1, prevLcm, graph, rootCase, offsetGranularity)    # recursively create all possible combinations 
+    createCombinationsRec(chain, 1, prevLcm, state, offsetGranularity)    # recursively explore all possible combinations 
+
+    if state.bestOffsets is None and not state.timedOut and not state.stopped:
+        # All offset combinations are worse than the incumbent, search again without it
+        state = HeuristicState(chain, offsetGranularity, prune, deadline)
+        state.setCallback(callback, interval)
+        createCombinationsRec(chain, 1, prevLcm, state, offsetGranularity)
+
+    if callback is not None and not state.stopped:
+        state.report()  # Final report
+
+    if state.bestOffsets is None:
+        # Stopped before the first end node was analyzed
+        for task, offset in zip(chain, initialOffsets):
+            task.offset = offset
+        return state
 
     # Now we have to assign the offsets to the task according to the smallest latency value that was found.
-    node = ret[1]    # Get the leafe node associated with the smallest latency
+    for task, offset in zip(chain, state.bestOffsets):
+        task.offset = offset * offsetGranularity
 
-    while True:
-        chain[node.task_id].offset = node.offset * offsetGranularity
-        assert graph.in_degree(node) <= 1
+    return state
 
-        if graph.in_degree(node) == 1:
-            inputEdges = graph.in_edges(node)
-            for u, v in inputEdges: #
-                node = u
-        else:
-            break
-    return ret[0]
+def heuristicOptimalPhasingAnytime(chain, offsetGranularity, callback, interval=1, prune=True, timeout_s=None):
+    """ Anytime version of heuristicOptimalPhasing. Every interval seconds (and once at the end), callback is called with a 
+        HeuristicProgress that contains the number of explored end nodes, the best latency and offsets found so far, and the gap 
+        to the lower bound of the latency. If the callback returns True, the search is stopped. The search is also stopped after timeout_s seconds.
+        The chain keeps the best offsets found, and their latency is returned (None if the search was stopped before the first end node). """
+    deadline = None
+    if timeout_s is not None:
+        deadline = timer() + timeout_s
 
-def createCombinationsRec(chain, pos, prevLcm, graph, node, offsetGranularity):
+    return searchOptimalPhasing(chain, offsetGranularity, prune, deadline, callback, interval).bestLatency
+
+def createCombinationsRec(chain, pos, prevLcm, state, offsetGranularity):
     """ Recursively explore all non-equivalent period combinations. """
 
+    if state.isStopped():
+        return
+
     if pos >= len(chain):
         # Analyze offsets if we reached the end of the chain.
+        maxLatency = state.evaluator.latency()
+        if maxLatency is None:
+            return  # Stopped during the analysis of the end node
 
-        #if chain[2].offset == mseconds(10):
-            #print("now")
-        maxLatency = calculateLatencyMartinezTCAD18(chain)
+        state.explored += 1
         #print("Analysing: " + chainString(chain) + " => Latency = " + printTime(maxLatency))
         
-        return [maxLatency, node]    # return the latency but also the final node, so we can reconstruct the offsets at the end
+        if state.isImprovement(maxLatency):
+            state.setBest(maxLatency)
+        return
+
+    if state.isPruned(state.lowerBound):
+        state.explored += state.endNodes[pos]
+        return  # No offset assignment can improve on the best latency
     
     period = int(chain[pos].period / offsetGranularity)
 
@@ -236,23 +651,127 @@ def createCombinationsRec(chain, pos, prevLcm, graph, node, offsetGranularity):
 
     prevLcm = math.lcm(period, prevLcm) # compute the LCM of all previous periods for the next depth
 
-    bestOffset = None
     for offset in range(0, rangeBound+1):
         #print("Pos: " + str(pos) + " Range Bound: " + str(rangeBound))
-        newNode = OffsetNode(pos, offset)
+        state.offsets[pos] = offset
         chain[pos].offset = offset * offsetGranularity  # Set the offset also for the task in the chain
-        graph.add_node(newNode)
-        graph.add_edge(node, newNode)
 
-        ret = createCombinationsRec(chain, pos+1, prevLcm, graph, newNode, offsetGranularity)
-        
-        if bestOffset is None:
-            bestOffset = ret
-        else:
-            if bestOffset[0] > ret[0]:
-                bestOffset = ret
+        if isPrefixPruned(chain, pos, state):
+            state.explored += state.endNodes[pos+1]
+            continue
+
+        createCombinationsRec(chain, pos+1, prevLcm, state, offsetGranularity)
+
+def isPrefixPruned(chain, pos, state):
+    """ Returns true if no offset assignment that keeps the offsets of the tasks 0, ..., pos can improve on the best latency. """
+    if not state.prune or pos + 1 >= len(chain):
+        return False
+
+    # The latency of the chain prefix grows at least by the period of each additional task, independent of its offset
+    bound = max(state.lowerBound, calculateLatencyMartinezTCAD18(chain[:pos+1]) + state.suffixPeriods[pos+1])
+
+    return state.isPruned(bound)
+
+def getOffsetPrefixes(chain, pos, depth, prevLcm, offsetGranularity, prefix, prefixes):
+    """ Recursively collects the offsets of the tasks 1, ..., depth of all paths in the offset tree (depth first order), 
+        together with the LCM of the periods that is needed to continue the search below them. """
+    if pos > depth:
+        prefixes.append((list(prefix), prevLcm))
+        return
+
+    period = int(chain[pos].period / offsetGranularity)
+
+    rangeBound = math.gcd(period, prevLcm)
+
+    for offset in range(0, rangeBound+1):
+        getOffsetPrefixes(chain, pos+1, depth, math.lcm(period, prevLcm), offsetGranularity, prefix + [offset], prefixes)
+
+""" 
+State of the worker processes of the parallel heuristic. The chain and the shared best latency are passed once 
+when the process pool is created, since a multiprocessing.Array can't be sent with the individual partitions.
+"""
+workerChain = None
+workerSharedBest = None
+
+def initHeuristicWorker(chain, sharedBest):
+    """ Initializer of the worker processes of the parallel heuristic. """
+    global workerChain, workerSharedBest
+    workerChain = chain
+    workerSharedBest = sharedBest
+
+def heuristicWorker(args):
+    """ Explores the sub-tree below one offset prefix. Returns the smallest latency and its offsets, or None if 
+        no offset assignment of the sub-tree is an improvement. """
+    partition, prefix, prevLcm, offsetGranularity, prune, incumbentLatency = args
+    chain = workerChain
+    depth = len(prefix)
+
+    state = HeuristicState(chain, offsetGranularity, prune)
+    state.incumbentLatency = incumbentLatency
+    state.sharedBest = workerSharedBest
+    state.partition = partition
+
+    for pos in range(1, depth+1):
+        state.offsets[pos] = prefix[pos-1]
+        chain[pos].offset = prefix[pos-1] * offsetGranularity
+
+        if isPrefixPruned(chain, pos, state):
+            return None
+
+    createCombinationsRec(chain, depth+1, prevLcm, state, offsetGranularity)
+
+    if state.bestOffsets is None:
+        return None
+
+    return state.bestLatency, state.bestOffsets
+
+def runHeuristicPartitions(chain, offsetGranularity, processes, splitDepth, prune, incumbentLatency):
+    """ Explores all partitions of the offset tree in a process pool and returns the smallest latency and its offsets 
+        (or None). For equal latencies, the first partition in depth first order is used, as in the sequential search. """
+    prefixes = []
+    getOffsetPrefixes(chain, 1, splitDepth, int(chain[0].period / offsetGranularity), offsetGranularity, [], prefixes)
+
+    sharedBest = multiprocessing.Array('d', [math.inf, math.inf])     # [latency, partition]
+    partitions = [(i, prefix, prevLcm, offsetGranularity, prune, incumbentLatency) for i, (prefix, prevLcm) in enumerate(prefixes)]
+
+    best = None
+    with multiprocessing.Pool(processes, initializer=initHeuristicWorker, initargs=(chain, sharedBest)) as pool:
+        for result in pool.imap(heuristicWorker, partitions, chunksize=1):    # Results are returned in partition order
+            if result is not None and (best is None or result[0] < best[0]):
+                best = result
+
+    return best
+
+def heuristicOptimalPhasingParallel(chain, offsetGranularity, processes=None, splitDepth=2, prune=True):
+    """ Parallel version of heuristicOptimalPhasing. The offset tree is split into the sub-trees below the offsets of the 
+        tasks 1, ..., splitDepth, which are explored by a pool of processes (default: one per CPU). If prune is set, the smallest 
+        latency found by any process is shared, so sub-trees can be pruned across processes. The latency and offsets are the 
+        same as with the sequential search. 
+        Daemonic processes can't have children (e.g., the workers of the pool in main.py), then the sequential search is used. 
+        The sequential search is also used for chains with less than three tasks. """
+
+    for task in chain:
+        assert task.period % offsetGranularity == 0
+
+    if multiprocessing.current_process().daemon or len(chain) < 3:
+        return heuristicOptimalPhasing(chain, offsetGranularity, prune)   # Too short to split, the offset of task 0 is always 0
+
+    splitDepth = max(1, min(splitDepth, len(chain) - 2))   # At least one task is explored below the split
+
+    incumbentLatency = getIncumbentLatency(chain) if prune else None
+
+    best = runHeuristicPartitions(chain, offsetGranularity, processes, splitDepth, prune, incumbentLatency)
+
+    if best is None:
+        # All offset combinations are worse than the incumbent, search again without it
+        best = runHeuristicPartitions(chain, offsetGranularity, processes, splitDepth, prune, None)
+
+    bestLatency, bestOffsets = best
+
+    for task, offset in zip(chain, bestOffsets):
+        task.offset = offset * offsetGranularity
 
-    return bestOffset
+    return bestLatency
 
 def getMaxDeltaHeuristic(chain):
     '''
@@ -268,60 +787,67 @@ def getMaxDeltaHeuristic(chain):
 
     return math.gcd(*periods)
 
-"""
-Implementation of the timeout functionality from here: https://ashutoshvarma.github.io/blog/timeout-on-function-call-in-python
-The idea is to spawn a thread and wait for its completion. If it does not complete within the timeout, the thread is killed.
-"""
-class MyTimeoutError(Exception):
-    # exception for our timeouts
-    pass
-def timeout_func(func, args=None, kwargs=None, timeout=30, default=None):
-    """This function will spawn a thread and run the given function
-    using the args, kwargs and return the given default value if the
-    timeout is exceeded.
-    http://stackoverflow.com/questions/492519/timeout-on-a-python-function-call
-    """
-    class InterruptableThread(threading.Thread):
-        def __init__(self):
-            threading.Thread.__init__(self)
-            self.result = default
-            self.exc_info = (None, None, None)
-        def run(self):
-            try:
-                self.result = func(*(args or ()), **(kwargs or {}))
-            except Exception as err:
-                self.exc_info = sys.exc_info()
-        def suicide(self):
-            raise MyTimeoutError(
-                "{0} timeout (taking more than {1} sec)".format(func.__name__, timeout)
-            )
-    it = InterruptableThread()
-    it.start()
-    it.join(timeout)
-    if it.exc_info[0] is not None:
-        a, b, c = it.exc_info
-        raise Exception(a, b, c)  # communicate that to caller
-    if it.is_alive():
-        it.suicide()
-        raise RuntimeError
-    else:
-        return it.result
-
-def heuristicOptimalPhasingTimeout(chain, offsetGranularity, timeout_s):
+def heuristicOptimalPhasingTimeout(chain, offsetGranularity, timeout_s, prune=False):
     '''
-    Calls heuristicOptimalPhasing with a timeout (in seconds). If the timeout triggered -1 is returned.
+    Calls heuristicOptimalPhasing with a timeout (in seconds). Returns the latency, the offsets and whether the timeout triggered.
+    The deadline is checked while the offset tree is explored, so the search stops without leaving a running thread behind. 
+    On a timeout, the best latency and offsets found so far are returned, and the chain keeps these offsets. 
+    If no end node was analyzed before the timeout, the latency is -1 and the chain keeps its initial offsets.
     '''
-    try:
-        retval = timeout_func(heuristicOptimalPhasing, args=(chain, offsetGranularity), timeout=timeout_s)
-    except MyTimeoutError as ex:
-        print(ex)
-        return -1
-    return retval
+    state = searchOptimalPhasing(chain, offsetGranularity, prune, timer() + timeout_s)
+
+    if state.timedOut:
+        print("heuristicOptimalPhasing timeout (taking more than %s sec)" % (timeout_s))
+
+    return getHeuristicResult(chain, state)
+
+def getHeuristicOffsets(chain, offsetGranularity, prune=False, timeout_s=None):
+    """ Version of heuristicOptimalPhasing (heuristicOptimalPhasingTimeout if timeout_s is set) that doesn't change the chain.
+        Returns the latency, the offsets found by the heuristic and whether the timeout triggered. On a timeout, the latency 
+        and offsets are the best ones found so far (-1 and the initial offsets if no end node was analyzed). """
+    phasedChain = withOffsets(chain, getOffsets(chain))
+
+    deadline = None
+    if timeout_s is not None:
+        deadline = timer() + timeout_s
+
+    state = searchOptimalPhasing(phasedChain, offsetGranularity, prune, deadline)
+
+    return getHeuristicResult(phasedChain, state)
+
+def getHeuristicResult(chain, state):
+    """ Returns the latency (-1 if no end node was analyzed), the offsets of the chain and whether the search timed out. """
+    latency = state.bestLatency
+    if latency is None:
+        latency = -1
+
+    return latency, getOffsets(chain), state.timedOut
 
 if __name__ == '__main__':
     """ Debugging """
     os.system('cls' if os.name == 'nt' else 'clear')    # Clear the terminal
 
+    # Timeout with a long hyperperiod: a single analysis of an end node takes about a minute, the search must still stop in time
+    print("\n=====================================================================================")
+    print("= Timeout of the heuristic with a long hyperperiod")
+    print("=====================================================================================")
+    chain = [Task('Task' + str(i), useconds(1), mseconds(period), mseconds(period), 0) for i, period in enumerate([7, 11, 13, 1000, 17, 19])]
+
+    start = timer()
+    heur, heurOffsets, timedOut = heuristicOptimalPhasingTimeout(chain, mseconds(1), 1)
+    duration = timer() - start
+
+    print("Heuristic: timed out = " + str(timedOut) + " after " + str(duration) + " s")
+    assert timedOut and duration < 1.5
+
+    reports = []
+    start = timer()
+    heuristicOptimalPhasingAnytime(chain, mseconds(1), lambda progress: reports.append(timer() - start), interval=0.5, timeout_s=1)
+    duration = timer() - start
+
+    print("Anytime heuristic: " + str(len(reports)) + " reports in " + str(duration) + " s")
+    assert duration < 1.5 and all(b - a < 0.75 for a, b in zip([0] + reports, reports))
+
     # # Example Fig. 12 in the paper
     # task1 = Task('Task1', useconds(1), mseconds(3), mseconds(3), 0)
     # task2 = Task('Task2', useconds(1), mseconds(7), mseconds(7), 0)
@@ -436,7 +962,7 @@ if __name__ == '__main__':
     print("Case Study: " + str(combinations) + " combinations are checked with the heuristic.")
 
     start = timer()
-    heur = heuristicOptimalPhasingTimeout(chain, getMaxDeltaHeuristic(chain), 1)#getMaxDeltaHeuristic(chain))
+    heur, heurOffsets, timedOut = heuristicOptimalPhasingTimeout(chain, getMaxDeltaHeuristic(chain), 1)#getMaxDeltaHeuristic(chain))
     duration = timer() - start
 
     print("Heuristic: " + chainString(chain) + " => Latency = " + printTime(heur) + " in " + str(duration * 1000) + " ms")
@@ -544,4 +1070,4 @@ if __name__ == '__main__':
     # print("Martinez Latency = " + printTime(calculateLatencyMartinezTCAD18(chain)))
 
     # print("Ours Optimal: " + chainString(chain) + " => Latency = " + printTime(opt))
-    # assert heur == opt
\ No newline at end of file
+    # assert heur == opt
@@ -6,9 +6,18 @@ This file implements the proposed optimal task phasing for single chains.
 
 * optimalPhasingMaxHarm(chain)      -> max-harmonic periods
 * optimalPhasing2kMaxHarm(chain)    -> (2,k)-max-harmonic periods
+
+Versions that don't change the offsets of the chain and return the offsets instead:
+* getOptimalOffsetsMaxHarm(chain)   -> max-harmonic periods
+* getOptimalOffsets2kMaxHarm(chain) -> (2,k)-max-harmonic periods
+
+Batch versions for many chains at once, given as padded 2-D period array (chains x positions) and chain lengths:
+* optimalPhasingMaxHarmBatch(periods, lengths)      -> offsets and latency bounds for max-harmonic periods
+* optimalPhasing2kMaxHarmBatch(periods, lengths)    -> offsets and latency bounds for (2,k)-max-harmonic periods
 """
 from Time import *
 from Task import *
+import numpy as np
 import os
 from DPT_Offset import *
 
@@ -89,6 +98,20 @@ def optimalPhasing2kMaxHarm(chain):
 
     return latencyBound
 
+def getOptimalOffsetsMaxHarm(chain):
+    """ Returns the optimal offsets of optimalPhasingMaxHarm and the end-to-end latency bound, without changing the chain. """
+    phasedChain = withOffsets(chain, getOffsets(chain))
+    latencyBound = optimalPhasingMaxHarm(phasedChain)
+
+    return getOffsets(phasedChain), latencyBound
+
+def getOptimalOffsets2kMaxHarm(chain):
+    """ Returns the optimal offsets of optimalPhasing2kMaxHarm and the end-to-end latency bound, without changing the chain. """
+    phasedChain = withOffsets(chain, getOffsets(chain))
+    latencyBound = optimalPhasing2kMaxHarm(phasedChain)
+
+    return getOffsets(phasedChain), latencyBound
+
 def getFirstOccurance(chain, period):
     """ Return the task with T == period that has the lowest index in the chain (i.e. the first occurance). """
 
@@ -119,6 +142,93 @@ def getPeriodSwitches(chain):
 
     return nu
 
+def getPeriodArray(chains):
+    """ Returns the periods of the chains as 2-D array (chains x positions), padded with 0, and the length of each chain. """
+    lengths = np.array([len(chain) for chain in chains], dtype=np.int64)
+    periods = np.zeros((len(chains), lengths.max(initial=0)), dtype=np.int64)
+
+    for i, chain in enumerate(chains):
+        periods[i, :len(chain)] = [task.period for task in chain]
+
+    return periods, lengths
+
+def getBatchMask(periods, lengths):
+    """ Returns a boolean array that is true for the positions that belong to a chain (i.e. are not padding). """
+    return np.arange(periods.shape[1]) < np.asarray(lengths)[:, None]
+
+def getExclusiveSum(values):
+    """ Returns the sum of all previous values of each position (along the chain). """
+    return np.cumsum(values, axis=1) - values
+
+def isMaxHarmonicBatch(periods, lengths):
+    """ Batch version of isMaxHarmonic. """
+    mask = getBatchMask(periods, lengths)
+    max1 = np.where(mask, periods, 0).max(axis=1)
+
+    return np.all(~mask | (max1[:, None] % np.where(mask, periods, 1) == 0), axis=1)
+
+def is2kMaxHarmonicBatch(periods, lengths):
+    """ Batch version of is2kMaxHarmonic. The hyperperiod is not needed: It is 2 * max1 if all periods divide 2 * max1, 
+        but not all of them max1. All other periods must divide max1 and max2. """
+    mask = getBatchMask(periods, lengths)
+    safePeriods = np.where(mask, periods, 1)
+    max1 = np.where(mask, periods, 0).max(axis=1)
+    max2 = np.where(mask & (periods < max1[:, None]), periods, 0).max(axis=1)
+
+    dividesHp = np.all(~mask | ((2 * max1)[:, None] % safePeriods == 0), axis=1)
+    others = mask & (periods < max2[:, None])
+    dividesMax = np.all(~others | ((max1[:, None] % safePeriods == 0) & (max2[:, None] % safePeriods == 0)), axis=1)
+
+    return (max2 > 0) & dividesHp & ~isMaxHarmonicBatch(periods, lengths) & dividesMax
+
+def optimalPhasingMaxHarmBatch(periods, lengths):
+    """ Batch version of optimalPhasingMaxHarm. Returns the offsets (chains x positions, 0 for padding) and the latency bounds. """
+    periods = np.asarray(periods, dtype=np.int64)
+    mask = getBatchMask(periods, lengths)
+    periods = np.where(mask, periods, 0)
+
+    # Definition 9: each task is released when the data of its predecessor is available
+    offsets = np.where(mask, getExclusiveSum(periods), 0)
+
+    # Theorem 10
+    latencyBounds = periods.sum(axis=1) + periods.max(axis=1)
+
+    return offsets, latencyBounds
+
+def optimalPhasing2kMaxHarmBatch(periods, lengths):
+    """ Batch version of optimalPhasing2kMaxHarm. Returns the offsets (chains x positions, 0 for padding) and the latency bounds. """
+    periods = np.asarray(periods, dtype=np.int64)
+    mask = getBatchMask(periods, lengths)
+    periods = np.where(mask, periods, 0)
+
+    assert np.all(is2kMaxHarmonicBatch(periods, lengths))
+
+    max1 = periods.max(axis=1)
+    max2 = np.where(periods < max1[:, None], periods, 0).max(axis=1)
+    isMax1 = periods == max1[:, None]
+    isMax2 = periods == max2[:, None]
+
+    # Compute tasks where periods switch between max1 and max2 (see getPeriodSwitches). The period of the 
+    # last task with max1 or max2 before each position is found by forward filling their indices.
+    positions = np.arange(periods.shape[1])
+    lastIndex = np.maximum.accumulate(np.where(isMax1 | isMax2, positions, -1), axis=1)
+    previousIndex = np.concatenate([np.full((len(periods), 1), -1), lastIndex[:, :-1]], axis=1)
+    previousPeriod = np.where(previousIndex >= 0, np.take_along_axis(periods, np.maximum(previousIndex, 0), axis=1), 0)
+    nu = (isMax1 | isMax2) & (previousPeriod != 0) & (previousPeriod != periods)
+
+    gamma = max1 % max2
+    switches = -(-nu.sum(axis=1) // 2) * gamma    # ceil(|nu| / 2) * gamma
+
+    # Tasks with max1 that follow a switch, except for the first one with max1, are delayed by gamma (Eq. 48, 49)
+    tau_p = np.argmax(isMax1, axis=1)
+    delayed = isMax1 & nu & (positions != tau_p[:, None]) & (switches < max1)[:, None]
+    offsets = np.where(mask, getExclusiveSum(periods) + gamma[:, None] * np.cumsum(delayed, axis=1), 0)
+
+    # Eq. 34
+    latencyBounds = periods.sum(axis=1) + max1 + np.minimum(max1, switches)
+
+    return offsets, latencyBounds
+
 if __name__ == '__main__':
     """ Debugging """
     os.system('cls' if os.name == 'nt' else 'clear')    # Clear the terminal
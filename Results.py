@@ -0,0 +1,353 @@
+"""
+This file implements the binary result files of the synthetic experiments. The results of one chain length are stored
+column by column: each column is a NumPy file (length_N.<column>.npy) with one value per chain, and the schema (column
+names, types and files) is stored as JSON in length_N.schema. Compared to the CSV-files of older experiments, values are
+stored without formatting and rounding, and each column is read memory-mapped without parsing, e.g. results['optPhasingLatency'].
+
+Counts that can exceed the uint64 range (e.g., the number of offset combinations of the heuristic) are stored exactly:
+values that do not fit are marked in the column, and their decimal value is stored in length_N.<column>.txt.
+
+* ResultWriter(path)                    -> Buffers rows in a typed array and appends them to the column files in blocks
+* readResultFile(path)                  -> Memory-mapped columns of binary results
+* truncateResults(path, count)          -> Removes all rows after the first count rows
+* readResults(dataFolder, length)       -> Columns of a chain length from the binary or (older experiments) CSV-file
+* getResultFiles(dataFolder, length)    -> Paths of the files that readResults reads
+* appendResults(srcPath, path)          -> Appends binary results to other binary results
+* convertCsvResults(csvPath, path)      -> Converts a CSV-file of older experiments and appends it to binary results
+"""
+import numpy as np
+import pandas as pd
+import json
+import io
+import os
+
+""" Columns of the results, in the order of the CSV-files (the CSV-files of older experiments end with maxHarmonic).
+    Latencies are normalized to the hyperperiod, durations are in seconds. """
+resultColumns = [
+    ("index", "<i8"),                   # Index of the chain
+    ("synchronousLatency", "<f8"),      # DPT analysis with synchronous release
+    ("durDpt", "<f8"),
+    ("optPhasingLatency", "<f8"),       # Latency bound of the optimal phasing
+    ("durOpt", "<f8"),
+    ("offsetLatency", "<f8"),           # DPT analysis with the optimal phasing
+    ("durDptOffset", "<f8"),
+    ("davareLatency", "<f8"),           # Davare bound (worst-case phasing)
+    ("durDavare", "<f8"),
+    ("rndPhasingLatency", "<f8"),       # DPT analysis with random phasing
+    ("durRandomPhasing", "<f8"),
+    ("martinezLatency", "<f8"),         # Analysis by Martinez et al. with the optimal phasing
+    ("durMartinez", "<f8"),
+    ("heuristicLatency", "<f8"),        # Offset heuristic by Martinez et al. (-1 if not executed or timeout)
+    ("durOffsetHeuristic", "<f8"),
+    ("combinations", "<u8"),            # Number of offset combinations of the heuristic (can exceed the uint64 range)
+    ("maxHarmonic", "?"),               # True if the chain is max-harmonic
+    ("heuristicBestLatency", "<f8"),    # Best latency the offset heuristic found, also on a timeout (-1 if none)
+    ("heuristicExplored", "<u8"),       # Number of end nodes of the offset tree the heuristic explored (can exceed the uint64 range)
+    ("heuristicTotal", "<u8"),          # Number of end nodes of the offset tree (0 if not executed)
+    ("heuristicGap", "<f8"),            # Relative gap between the best latency and its lower bound (-1 if none)
+]
+
+csvColumnCount = 17                     # Number of columns in the CSV-files of older experiments
+
+largeColumns = ["combinations", "heuristicExplored", "heuristicTotal"]  # Integer columns with exact values beyond the uint64 range
+
+""" Records of the results in memory (e.g., the results of a chunk of chains). Large columns are Python integers. """
+resultDtype = np.dtype([(name, object if name in largeColumns else format) for name, format in resultColumns])
+
+largeMarker = np.iinfo(np.uint64).max   # Marks values of large columns that are stored in the text file of the column
+
+headerSize = 128                        # Size of the header of the column files, fixed so it can be rewritten in place
+
+def getSchemaPath(path):
+    """ Returns the path of the schema of binary results (path is length_N without extension). """
+    return path + ".schema"
+
+def getColumnPath(path, name):
+    """ Returns the path of the NumPy file of a column. """
+    return path + "." + name + ".npy"
+
+def getLargePath(path, name):
+    """ Returns the path of the text file with the values of a large column that exceed the uint64 range. """
+    return path + "." + name + ".txt"
+
+def readSchema(path):
+    """ Returns the columns of binary results as list of [name, format]. """
+    with open(getSchemaPath(path)) as file:
+        schema = json.load(file)
+
+    return [[column["name"], column["format"]] for column in schema["columns"]]
+
+def writeSchema(path):
+    """ Stores the schema of binary results, the files of the columns are relative to the schema. """
+    columns = []
+    for name, format in resultColumns:
+        column = {"name": name, "format": format, "file": os.path.basename(getColumnPath(path, name))}
+        if name in largeColumns:
+            column["large"] = os.path.basename(getLargePath(path, name))
+        columns.append(column)
+
+    with open(getSchemaPath(path), "w") as file:
+        json.dump({"columns": columns}, file)
+
+def writeColumnHeader(file, format, count):
+    """ Writes the header of a NumPy file (version 1.0) with count values. The header always has the same size. """
+    header = "{'descr': %r, 'fortran_order': False, 'shape': (%d,), }" % (format, count)
+    header = header.ljust(headerSize - 10 - 1) + "\n"
+
+    file.seek(0)
+    file.write(b"\x93NUMPY\x01\x00" + len(header).to_bytes(2, "little") + header.encode("latin1"))
+
+def readColumnCount(columnPath):
+    """ Returns the number of values in the header of a NumPy file. """
+    with open(columnPath, "rb") as file:
+        version = np.lib.format.read_magic(file)
+        assert version == (1, 0), "Unsupported version of " + columnPath
+        shape, fortranOrder, dtype = np.lib.format.read_array_header_1_0(file)
+
+    return shape[0]
+
+def readLargeValues(path, name, count):
+    """ Returns the values of a large column that exceed the uint64 range as dictionary row -> value (rows < count). """
+    values = {}
+
+    if os.path.isfile(getLargePath(path, name)):
+        with open(getLargePath(path, name)) as file:
+            for line in file:
+                if not line.endswith("\n"):             # Partially written line
+                    break
+                row, value = line.split()
+                if int(row) < count:
+                    values[int(row)] = int(value)
+
+    return values
+
+def writeLargeValues(path, name, values):
+    """ Stores the values of a large column that exceed the uint64 range (dictionary row -> value). """
+    with open(getLargePath(path, name), "w") as file:
+        for row in sorted(values):
+            file.write(str(row) + " " + str(values[row]) + "\n")
+
+class ResultWriter:
+    """ Class to append results to binary results. The rows are buffered in a typed array and written in blocks.
+        The number of rows in the headers of the column files is only updated by flush, after the values are written. """
+
+    def __init__(self, path, blockSize=1000):
+        self.path = path                                        # Binary results (length_N without extension)
+        self.buffer = np.zeros(blockSize, dtype=resultDtype)    # Rows that are not yet written
+        self.buffered = 0                                       # Number of rows in the buffer
+        self.files = {}                                         # Open column files
+        self.largeFiles = {}                                    # Open text files of the large columns
+
+        if os.path.isfile(getSchemaPath(path)):
+            assert readSchema(path) == [[name, format] for name, format in resultColumns], "The results in " + path + " have another schema"
+        else:
+            writeSchema(path)
+
+        counts = set()
+        for name, format in resultColumns:
+            columnPath = getColumnPath(path, name)
+            if os.path.isfile(columnPath):
+                counts.add(readColumnCount(columnPath))
+                self.files[name] = open(columnPath, "r+b")
+            else:
+                counts.add(0)
+                self.files[name] = open(columnPath, "w+b")
+                writeColumnHeader(self.files[name], format, 0)
+
+        assert len(counts) == 1, "The columns of " + path + " have different lengths (see truncateResults)"
+        self.count = counts.pop()                               # Number of rows in the files
+
+        for name, format in resultColumns:                     # Values after the last complete row are overwritten
+            self.files[name].truncate(headerSize + self.count * np.dtype(format).itemsize)
+
+        for name in largeColumns:
+            writeLargeValues(path, name, readLargeValues(path, name, self.count))
+            self.largeFiles[name] = open(getLargePath(path, name), "a")
+
+    def append(self, row):
+        """ Adds one row (tuple of the values in the order of resultColumns). """
+        self.buffer[self.buffered] = row
+        self.buffered += 1
+
+        if self.buffered == len(self.buffer):
+            self.writeBuffer()
+
+    def extend(self, records):
+        """ Adds the records (array with dtype resultDtype or a dictionary of columns). """
+        self.writeBuffer()
+        self.writeRecords(records)
+
+    def writeBuffer(self):
+        """ Writes the rows in the buffer to the files. """
+        if self.buffered > 0:
+            self.writeRecords(self.buffer[:self.buffered])
+            self.buffered = 0
+
+    def writeRecords(self, records):
+        """ Appends the values of each column to its file. """
+        count = len(records["index"])
+
+        for name, format in resultColumns:
+            values = records[name]
+
+            if name in largeColumns:
+                values = list(values)
+                for row, value in enumerate(values):
+                    assert value >= 0, "Negative value in column " + name
+                    if value >= largeMarker:
+                        self.largeFiles[name].write(str(self.count + row) + " " + str(int(value)) + "\n")
+                        values[row] = largeMarker
+                values = np.array([int(value) for value in values], dtype=format)  # Exact, without a detour via float
+
+            self.files[name].seek(0, io.SEEK_END)
+            self.files[name].write(np.asarray(values).astype(format).tobytes())
+
+        self.count += count
+
+    def flush(self):
+        """ Writes all rows to the files, updates the headers and returns the number of rows. """
+        self.writeBuffer()
+
+        for file in self.largeFiles.values():
+            file.flush()
+
+        for name, format in resultColumns:
+            self.files[name].flush()
+            writeColumnHeader(self.files[name], format, self.count)
+            self.files[name].flush()
+
+        return self.count
+
+    def close(self):
+        self.flush()
+        for file in list(self.files.values()) + list(self.largeFiles.values()):
+            file.close()
+
+def readResultFile(path):
+    """ Returns the columns of binary results as dictionary name -> array. The columns are memory-mapped (read-only), only
+        large columns with values beyond the uint64 range are read into memory. Rows that are not in all columns are ignored. """
+    schema = readSchema(path)
+    columns = {name: np.load(getColumnPath(path, name), mmap_mode="r") for name, format in schema}
+    count = min(len(column) for column in columns.values())
+
+    for name, format in schema:
+        columns[name] = columns[name][:count]
+
+        if name in largeColumns:
+            largeValues = readLargeValues(path, name, count)
+            if len(largeValues) > 0:
+                columns[name] = np.array([int(value) for value in columns[name]], dtype=object)
+                for row, value in largeValues.items():
+                    columns[name][row] = value
+
+    return columns
+
+def truncateResults(path, count):
+    """ Removes all rows of binary results after the first count rows. The columns must not be memory-mapped. """
+    for name, format in readSchema(path):
+        columnPath = getColumnPath(path, name)
+        assert readColumnCount(columnPath) >= count, "The column " + columnPath + " has less than " + str(count) + " rows"
+
+        with open(columnPath, "r+b") as file:
+            writeColumnHeader(file, format, count)
+            file.truncate(headerSize + count * np.dtype(format).itemsize)
+
+        if name in largeColumns and os.path.isfile(getLargePath(path, name)):
+            writeLargeValues(path, name, readLargeValues(path, name, count))
+
+def readCsvResults(path):
+    """ Returns the records of a CSV result file of older experiments. A partially written row at the end is ignored.
+        The columns that are not in the CSV-files are derived from the heuristic latency. """
+    with open(path, "rb") as file:
+        content = file.read()
+
+    content = content[:content.rfind(b"\n") + 1]    # Only complete rows
+    records = np.zeros(content.count(b"\n"), dtype=resultDtype)
+
+    if len(records) > 0:
+        names = resultDtype.names[:csvColumnCount]
+        df = pd.read_csv(io.BytesIO(content), header=None, names=names, dtype={"maxHarmonic": str, "combinations": str})
+        for name in names:
+            if name == "maxHarmonic":
+                records[name] = df[name] == "True"
+            elif name in largeColumns:
+                records[name] = [int(value) for value in df[name]]     # Exact, the CSV-files store the integers
+            else:
+                records[name] = df[name]
+
+        records["heuristicBestLatency"] = records["heuristicLatency"]
+        records["heuristicGap"] = -1
+
+    return records
+
+def convertCsvResults(csvPath, path):
+    """ Appends the complete rows of a CSV result file of older experiments to binary results (which are created if they don't exist). """
+    writer = ResultWriter(path)
+    writer.extend(readCsvResults(csvPath))
+    writer.close()
+
+def appendResults(srcPath, path):
+    """ Appends the rows of the binary results srcPath to the binary results path (which are created if they don't exist). """
+    writer = ResultWriter(path)
+    writer.extend(readResultFile(srcPath))
+    writer.close()
+
+def getResultPath(dataFolder, length):
+    """ Returns the path of the binary results of the chain length (without extension). """
+    return dataFolder + "/length_" + str(length)
+
+def getResultFiles(dataFolder, length):
+    """ Returns the paths of the files of the results of the chain length (schema, columns and large values of the binary
+        results or, for older experiments, the CSV-file), or None if there are no results. """
+    path = getResultPath(dataFolder, length)
+
+    if os.path.isfile(getSchemaPath(path)):
+        files = [getSchemaPath(path)] + [getColumnPath(path, name) for name, format in readSchema(path)]
+        return files + [getLargePath(path, name) for name in largeColumns if os.path.isfile(getLargePath(path, name))]
+
+    if os.path.isfile(path + ".csv"):
+        return [path + ".csv"]
+
+    return None
+
+def readResults(dataFolder, length):
+    """ Returns the columns of the chain length as dictionary name -> array, or None if there are no results. """
+    path = getResultPath(dataFolder, length)
+
+    if os.path.isfile(getSchemaPath(path)):
+        return readResultFile(path)
+
+    if os.path.isfile(path + ".csv"):
+        records = readCsvResults(path + ".csv")
+        return {name: records[name] for name in records.dtype.names}
+
+    return None
+
+if __name__ == '__main__':
+    """ Debugging """
+    import tempfile
+
+    dataFolder = tempfile.mkdtemp()
+
+    writer = ResultWriter(getResultPath(dataFolder, 2), blockSize=2)
+    for i in range(1, 6):
+        writer.append((i, 1.0, 0.1, 0.5, 0.1, 0.5, 0.1, 2.0, 0.1, 0.75, 0.1, 0.5, 0.1, -1, -1, 2**70 + i if i % 2 else 2**53 + 1, i % 2 == 0, 0.5, 3**50, 3**50 + 1, 0.25))
+    print("Rows: " + str(writer.flush()))
+    writer.close()
+
+    results = readResults(dataFolder, 2)
+    print(results)
+    assert list(results["index"]) == [1, 2, 3, 4, 5] and isinstance(results["optPhasingLatency"], np.memmap)
+    assert list(results["combinations"]) == [2**70 + 1, 2**53 + 1, 2**70 + 3, 2**53 + 1, 2**70 + 5]
+    assert list(results["heuristicTotal"]) == [3**50 + 1] * 5
+
+    del results
+    truncateResults(getResultPath(dataFolder, 2), 2)
+    results = readResults(dataFolder, 2)
+    assert list(results["combinations"]) == [2**70 + 1, 2**53 + 1]
+
+    with open(dataFolder + "/length_4.csv", "w") as file:
+        file.write("1,1.000000,0.1,0.500000,0.1,0.5,0.1,2.0,0.1,0.75,0.1,0.5,0.1,-1.000000,-1.000000,1180591620717411303427,True\n2,1.0,0.1")
+    results = readResults(dataFolder, 4)
+    assert len(results["index"]) == 1 and results["maxHarmonic"][0] and results["combinations"][0] == 2**70 + 3
+    assert results["heuristicExplored"][0] == 0 and results["heuristicBestLatency"][0] == -1
@@ -6,12 +6,39 @@ Random chain generation:
 * generateRandomTasks(...)            -> Random chains with automotive periods
 * generateRandomTasks2kMax(...)       -> Random chains with (2,k)-max-harmonic periods
 * generateRandomTasksMaxHarmonic(...) -> Random chains with max-harmonic periods
+
+Direct sampling (no rejection loop, same distribution as the generators above):
+* generateRandomTasks2kMaxDirect(...)                   -> Random chains with (2,k)-max-harmonic periods
+* generateRandomTasksMaxHarmonicDirect(...)             -> Random chains with max-harmonic periods
+* generateRandomTasksAutomotiveMaxHarmonicDirect(...)   -> generateRandomTasks(...) conditioned on max-harmonic periods
+
+Bulk generation (NumPy arrays, one reproducible random stream per chain):
+* generateChains(n, length, periodModel, seed, ...)     -> Periods and WCETs of n chains
+* createChains(periods, wcets)                          -> Lists of tasks for the arrays of generateChains
+
+Period sets (cached catalogs of all sets, optionally stored in periodSetCacheDir):
+* generatePeriodSet(...)              -> Random (2,k)-max-harmonic period set
+* generateMaxHarmonicPeriodSet(...)   -> Random max-harmonic period set
+
+Offsets of chains:
+* getOffsets(chain)                   -> List of the task offsets
+* withOffsets(chain, offsets)         -> Copy of the chain with other offsets (the chain is not changed)
 """
 
 from Time import *
 from drs import drs
 import random
 import math
+import copy
+import json
+import bisect
+import os
+import numpy as np
+
+periodSetCacheDir = None    # If set, catalogs of period sets are also stored as JSON files in this folder and loaded from there
+periodSetCatalogs = {}      # Catalogs of period sets that are already computed in this process
+samplerWeights = {}         # Weights of the direct samplers and generateChains (see getClassWeights, getSetWeights, getChainClasses)
+divisorTables = {}          # Divisor tables (see getDivisorTable) that are already computed in this process
 
 class Task:
     """ Class to represent a periodic task """
@@ -34,16 +61,56 @@ class Task:
         return "Task: %s, T=%s, C=%s, D=%s, O=%s, P=%s, RT=%s" % (self.name, printTime(self.period), printTime(self.wcet), printTime(self.deadline), printTime(self.offset), self.priority, self.responseTime)
     
     def getJobsUntil(self, until):
-        """ Returns a list of jobs that are released between 0 and until. """
+        """ Returns a view of the jobs that are released between 0 and until. Jobs are only created when accessed. """
         count = math.ceil(until / self.period)
 
-        jobs = []
+        return JobView(self, 0, count)
+
+    def getJobIdRange(self, start, end):
+        """ Returns the range of job ids that are released in [start, end). """
+        first = max(0, -((self.offset - start) // self.period))    # ceil((start - offset) / period)
+        last = max(first, -((self.offset - end) // self.period))   # ceil((end - offset) / period)
+
+        return range(first, last)
+
+class JobView:
+    """ Class to represent the jobs of a task with ids in [first, last) as a sequence. 
+        Jobs are not stored, but created from their id when they are accessed. """
+    def __init__(self, task, first, last):
+        self.task = task                            # Task the jobs belong to
+        self.first = first                          # ID of the first job in the view
+        self.last = max(first, last)                # ID after the last job in the view
 
-        for j in range(0,count,1):
-            tmpJob = Job(self, j)
-            jobs.append(tmpJob)
+    def __len__(self):
+        return self.last - self.first
 
-        return jobs
+    def __getitem__(self, index):
+        """ Returns the job at the given position in the view, or a view of the jobs in a slice. """
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            assert step == 1, "Only contiguous slices of jobs are supported."
+            return JobView(self.task, self.first + start, self.first + stop)
+
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("job index out of range")
+
+        return Job(self.task, self.first + index)
+
+    def __iter__(self):
+        for id in range(self.first, self.last):
+            yield Job(self.task, id)
+
+    def window(self, start, end):
+        """ Returns a view of the jobs in this view that are released in [start, end). """
+        ids = self.task.getJobIdRange(start, end)
+
+        return JobView(self.task, max(self.first, ids.start), min(self.last, ids.stop))
+
+    def __str__(self):
+        """ Print view information. """
+        return "Jobs(%s, %s..%s)" % (self.task.name, self.first, self.last)
 
 class Job:
     """ Class to represent a job/instance of a task. """
@@ -132,6 +199,317 @@ def generateRandomTasksMaxHarmonic(count, utilization, numPeriods, maxAllowedPer
 
     return tasks
 
+"""
+Direct samplers. The rejection samplers above pick a period set S, draw each period uniformly from S, and 
+repeat until the chain is accepted. The output distribution is the same if S is picked with a probability 
+proportional to the probability that a chain from S is accepted, and the chain is then drawn uniformly from 
+the accepted chains of S. The accepted chains of S are split into classes that are counted exactly:
+- max-harmonic: for each largest period M, all chains that contain M and only periods that divide M
+- (2,k)-max harmonic: for each pair of largest periods max1 > max2 with lcm(max1, max2) = 2 * max1, all chains 
+  that contain max1 and max2 and otherwise only smaller periods that divide both (this also covers chains 
+  that use only a part of S and are (2,k)-max harmonic for another k)
+A class with a symbols and r required periods contains the sequences of length n over the a symbols that 
+contain the required ones, e.g., a^n - (a-1)^n for one and a^n - 2(a-1)^n + (a-2)^n for two required periods.
+"""
+def generateRandomTasks2kMaxDirect(count, utilization, k, numPeriods, maxAllowedPeriod):
+    """ Same distribution as generateRandomTasks2kMax, without the rejection loop. """
+    periodSets = getPeriodSetCatalog(k, numPeriods, maxAllowedPeriod)
+    weights = getSetWeights(("2kMax", k, numPeriods, maxAllowedPeriod, count), periodSets, get2kMaxHarmonicClasses, count)
+
+    periods = periodSets[sampleIndex(weights)]
+
+    utilizations = drs(count, utilization)
+    sequence = sampleSequence(periods, get2kMaxHarmonicClasses, count)
+
+    return createTasks(sequence, utilizations)
+
+def generateRandomTasksMaxHarmonicDirect(count, utilization, numPeriods, maxAllowedPeriod):
+    """ Same distribution as generateRandomTasksMaxHarmonic, without the rejection loop. """
+    periodSets = getMaxHarmonicPeriodSetCatalog(numPeriods, maxAllowedPeriod)
+    weights = getSetWeights(("maxHarmonic", numPeriods, maxAllowedPeriod, count), periodSets, getMaxHarmonicClasses, count)
+
+    periods = periodSets[sampleIndex(weights)]
+
+    utilizations = drs(count, utilization)
+    sequence = sampleSequence(periods, getMaxHarmonicClasses, count)
+
+    return createTasks(sequence, utilizations)
+
+def generateRandomTasksAutomotiveMaxHarmonicDirect(count, utilization):
+    """ Same distribution as calling generateRandomTasks until the chain is max-harmonic, without the rejection loop. """
+    periods = [1, 2, 5, 10, 20, 50, 100, 200, 1000] # Periods from "Real world automotive benchmark for free" WATERS 2015
+
+    utilizations = drs(count, utilization)
+    sequence = sampleSequence(periods, getMaxHarmonicClasses, count)
+
+    return createTasks(sequence, utilizations)
+
+def createTasks(periods, utilizations):
+    """ Creates the tasks of a chain with the given periods (in ms) and utilizations, as the random generators above. """
+    tasks = []
+    id = 0
+
+    for period, u in zip(periods, utilizations):
+        period = mseconds(period)
+        wcet = math.ceil((u * period) / 1)
+
+        tasks.append(Task("Task_%s" % (id), wcet, period, period, 0))
+        id += 1
+
+    return tasks
+
+def getMaxHarmonicClasses(periods):
+    """ Returns the classes (symbols, required symbols) of max-harmonic sequences over the periods. """
+    periods = sorted(set(periods))
+    return [([p for p in periods if M % p == 0], [M]) for M in periods]
+
+def get2kMaxHarmonicClasses(periods):
+    """ Returns the classes (symbols, required symbols) of (2,k)-max harmonic sequences over the periods. """
+    periods = sorted(set(periods))
+    classes = []
+
+    for i, max1 in enumerate(periods):
+        for max2 in periods[:i]:
+            if math.lcm(max1, max2) != 2 * max1:    # The hyperperiod needs to be 2 * max1
+                continue
+            others = [p for p in periods if p < max2 and max1 % p == 0 and max2 % p == 0]
+            classes.append((others + [max2, max1], [max2, max1]))
+
+    return classes
+
+def getClassWeights(periods, getClasses, length):
+    """ Returns the classes of accepted sequences of the given length over the periods and their cumulative weights 
+        (i.e., number of sequences). The result is computed once per period set. """
+    key = (getClasses.__name__, tuple(periods), length)
+
+    if key not in samplerWeights:
+        classes = getClasses(periods)
+
+        cumulativeWeights = []
+        total = 0
+        for symbols, required in classes:
+            total += countCoveringSequences(len(symbols), len(required), length)
+            cumulativeWeights.append(total)
+
+        samplerWeights[key] = (classes, (cumulativeWeights, total))
+
+    return samplerWeights[key]
+
+def getSetWeights(key, periodSets, getClasses, length):
+    """ Returns the cumulative selection weights of a catalog of period sets and their sum. The probability that a random 
+        sequence over a set with s periods is accepted is accepted / s^length. Weights are scaled to integers with the common 
+        denominator lcm(s)^length, so the selection is exact. The weights are computed once per key. """
+    if key not in samplerWeights:
+        setWeights = [(getClassWeights(periods, getClasses, length)[1][1], len(periods)) for periods in periodSets]
+        denominator = math.lcm(*[s for _, s in setWeights]) ** length
+
+        cumulativeWeights = []
+        total = 0
+        for accepted, s in setWeights:
+            total += accepted * (denominator // s**length)
+            cumulativeWeights.append(total)
+
+        assert total > 0, "No chain can be generated for " + str(key)
+        samplerWeights[key] = (cumulativeWeights, total)
+
+    return samplerWeights[key]
+
+def sampleSequence(periods, getClasses, length):
+    """ Returns a uniformly distributed accepted sequence of the given length over the periods. """
+    classes, weights = getClassWeights(periods, getClasses, length)
+    symbols, required = classes[sampleIndex(weights)]
+
+    return sampleCoveringSequence(symbols, required, length)
+
+def sampleIndex(cumulativeWeights):
+    """ Returns a random index, selected with the (cumulativeWeights, total) of getClassWeights or getSetWeights. """
+    weights, total = cumulativeWeights
+    return bisect.bisect_right(weights, random.randrange(total))
+
+def countCoveringSequences(symbols, required, length):
+    """ Returns the number of sequences of the given length over a number of symbols that contain each of the 
+        required symbols at least once (inclusion-exclusion). """
+    return sum((-1)**i * math.comb(required, i) * (symbols - i)**length for i in range(required + 1))
+
+def sampleCoveringSequence(symbols, required, length):
+    """ Returns a uniformly distributed sequence of the given length over the symbols that contains all required symbols. 
+        Each position is drawn with the exact probability that a uniform covering sequence has the symbol at this position. """
+    missing = set(required)
+    sequence = []
+
+    for position in range(length):
+        if not missing:
+            sequence.append(symbols[random.randrange(len(symbols))])   # All required symbols are contained, the rest is uniform
+            continue
+
+        remaining = length - position - 1
+        total = countCoveringSequences(len(symbols), len(missing), remaining + 1)
+
+        # Number of covering sequences that continue with a missing symbol resp. any other symbol
+        missingCount = countCoveringSequences(len(symbols), len(missing) - 1, remaining)
+        otherCount = countCoveringSequences(len(symbols), len(missing), remaining)
+
+        r = random.randrange(total)
+        for symbol in symbols:
+            r -= missingCount if symbol in missing else otherCount
+            if r < 0:
+                break
+
+        missing.discard(symbol)
+        sequence.append(symbol)
+
+    return sequence
+
+"""
+Bulk generation. generateChains returns n chains at once as int64 arrays of the periods and WCETs (shape n x length). 
+Chain i is only generated from its own random stream getChainRng(seed, length, start + i), so a chain does not depend 
+on the batch it is generated in. Each stream provides one block of uniform numbers, the transformation of the blocks 
+is vectorized over all chains:
+- utilizations: normalized exponentials, i.e., uniform on the simplex as drs without bounds
+- periods: the class of accepted sequences (see direct samplers) is selected over all period sets of the model at once, 
+  the sequence is drawn position by position as in sampleCoveringSequence
+The period models have the same distribution as the generators above:
+- "automotive": generateRandomTasks
+- "automotiveMaxHarmonic": generateRandomTasksAutomotiveMaxHarmonicDirect
+- "maxHarmonic": generateRandomTasksMaxHarmonic (numPeriods, maxAllowedPeriod)
+- "2kMax": generateRandomTasks2kMax (k, numPeriods, maxAllowedPeriod)
+"""
+def generateChains(n, length, periodModel, seed, utilization=0.5, k=None, numPeriods=None, maxAllowedPeriod=None, start=0):
+    """ Generates n random chains with the period model and returns their periods and WCETs (int64 arrays of shape n x length). """
+    symbols, symbolCounts, requiredCounts, cumulativeProbabilities = getChainClasses(periodModel, length, k, numPeriods, maxAllowedPeriod)
+
+    # One block of uniform numbers per chain: class, utilizations and periods
+    uniforms = np.empty((n, 2 * length + 1))
+    for i in range(n):
+        uniforms[i] = getChainRng(seed, length, start + i).random(2 * length + 1)
+
+    classes = np.searchsorted(cumulativeProbabilities, uniforms[:, 0], side="right")
+
+    exponentials = -np.log1p(-uniforms[:, 1:length+1])
+    utilizations = utilization * exponentials / exponentials.sum(axis=1, keepdims=True)
+
+    sequences = sampleCoveringSequences(symbols[classes], symbolCounts[classes], requiredCounts[classes], uniforms[:, length+1:])
+
+    periods = sequences * mseconds(1)
+    wcets = np.ceil(utilizations * periods).astype(np.int64)    # Same rounding as createTasks
+
+    return periods, wcets
+
+def getChainRng(seed, length, index):
+    """ Returns the random number generator of the chain with the index, derived from (seed, length, index). """
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(length, index)))
+
+def createChains(periods, wcets):
+    """ Creates the chains (lists of tasks) for the periods and WCETs of generateChains. """
+    chains = []
+
+    for chainPeriods, chainWcets in zip(periods.tolist(), wcets.tolist()):
+        chains.append([Task("Task_%s" % (id), wcet, period, period, 0) for id, (period, wcet) in enumerate(zip(chainPeriods, chainWcets))])
+
+    return chains
+
+def getChainClasses(periodModel, length, k=None, numPeriods=None, maxAllowedPeriod=None):
+    """ Returns the classes of accepted sequences over all period sets of the period model as arrays: symbols (padded, 
+        required symbols first), number of symbols, number of required symbols and the cumulative selection probabilities. 
+        The probability of a class is the probability of its period set times the probability of the class in the set. 
+        The arrays are computed once per configuration. """
+    key = ("chains", periodModel, length, k, numPeriods, maxAllowedPeriod)
+
+    if key not in samplerWeights:
+        automotive = [1, 2, 5, 10, 20, 50, 100, 200, 1000]  # Periods from "Real world automotive benchmark for free" WATERS 2015
+
+        if periodModel == "automotive":
+            classes = [((automotive, []), 1)]
+        elif periodModel == "automotiveMaxHarmonic":
+            classes = getWeightedClasses([automotive], getMaxHarmonicClasses, length)
+        elif periodModel == "maxHarmonic":
+            classes = getWeightedClasses(getMaxHarmonicPeriodSetCatalog(numPeriods, maxAllowedPeriod), getMaxHarmonicClasses, length)
+        else:
+            assert periodModel == "2kMax", "Unknown period model: " + str(periodModel)
+            classes = getWeightedClasses(getPeriodSetCatalog(k, numPeriods, maxAllowedPeriod), get2kMaxHarmonicClasses, length)
+
+        maxSymbols = max(len(symbols) for (symbols, _), _ in classes)
+        symbolArray = np.zeros((len(classes), maxSymbols), dtype=np.int64)
+        symbolCounts = np.zeros(len(classes), dtype=np.int64)
+        requiredCounts = np.zeros(len(classes), dtype=np.int64)
+        cumulativeWeights = []
+        total = 0
+
+        for index, ((symbols, required), weight) in enumerate(classes):
+            ordered = list(required) + [symbol for symbol in symbols if symbol not in required]
+            symbolArray[index, :len(ordered)] = ordered
+            symbolCounts[index] = len(ordered)
+            requiredCounts[index] = len(required)
+            total += weight
+            cumulativeWeights.append(total)
+
+        assert total > 0, "No chain can be generated for " + str(key)
+        cumulativeProbabilities = np.array([weight / total for weight in cumulativeWeights])  # Correctly rounded division of the integers
+
+        samplerWeights[key] = (symbolArray, symbolCounts, requiredCounts, cumulativeProbabilities)
+
+    return samplerWeights[key]
+
+def getWeightedClasses(periodSets, getClasses, length):
+    """ Returns the classes of all period sets with integer weights, scaled to the common denominator of getSetWeights. """
+    denominator = math.lcm(*[len(periods) for periods in periodSets]) ** length
+    weightedClasses = []
+
+    for periods in periodSets:
+        classes, (cumulativeWeights, _) = getClassWeights(periods, getClasses, length)
+        scale = denominator // len(periods)**length
+
+        previous = 0
+        for cls, cumulative in zip(classes, cumulativeWeights):
+            weightedClasses.append((cls, (cumulative - previous) * scale))
+            previous = cumulative
+
+    return weightedClasses
+
+def sampleCoveringSequences(symbols, symbolCounts, requiredCounts, uniforms):
+    """ Vectorized sampleCoveringSequence for a batch of classes (one per row, required symbols first). The sequence of 
+        each row is drawn with the uniform numbers of the row. """
+    n, length = uniforms.shape
+    rows = np.arange(n)
+    slots = np.arange(symbols.shape[1])
+
+    missing = slots < requiredCounts[:, None]                   # Required symbols that are not yet in the sequence
+    valid = slots < symbolCounts[:, None]
+    sequences = np.zeros((n, length), dtype=np.int64)
+
+    for position in range(length):
+        remaining = length - position - 1
+        missingCounts = missing.sum(axis=1)
+
+        # Probabilities of a missing symbol resp. any other symbol, as fraction of the covering sequences (see sampleCoveringSequence)
+        total = getCoverProbability(symbolCounts, missingCounts, remaining + 1) * symbolCounts
+        missingProbability = getCoverProbability(symbolCounts, missingCounts - 1, remaining) / total
+        otherProbability = getCoverProbability(symbolCounts, missingCounts, remaining) / total
+
+        probabilities = np.where(missing, missingProbability[:, None], otherProbability[:, None]) * valid
+        cumulative = np.cumsum(probabilities, axis=1)
+
+        # Scaled by the sum, so rounding errors never select a symbol with probability 0
+        slot = np.sum(cumulative <= uniforms[:, position, None] * cumulative[:, -1, None], axis=1)
+
+        missing[rows, slot] = False
+        sequences[:, position] = symbols[rows, slot]
+
+    return sequences
+
+def getCoverProbability(symbolCounts, requiredCounts, length):
+    """ Returns the probability that a uniform sequence of the given length over a number of symbols contains each of the 
+        required symbols (countCoveringSequences / symbols^length, element-wise). """
+    probability = np.zeros(len(symbolCounts))
+
+    for i in range(max(int(requiredCounts.max()), 0) + 1):
+        sign = (-1)**i
+        binomial = np.array([math.comb(r, i) for r in np.maximum(requiredCounts, 0).tolist()])
+        term = sign * binomial * (1 - i / symbolCounts) ** length
+        probability += np.where(i <= requiredCounts, term, 0)
+
+    return probability
+
 def tasksetUtilization(tasks):
     """ Function to compute the utilization of a taskset. """
     utilization = 0.0
@@ -197,9 +575,41 @@ def chainString(chain):
 
     return retval
 
+def getOffsets(chain):
+    """ Returns the offsets of the tasks in the chain. """
+    return [task.offset for task in chain]
+
+def withOffsets(chain, offsets):
+    """ Returns a shallow copy of the chain where the tasks have the given offsets. The tasks of the chain are not changed, 
+        so one chain can be analyzed under several phasings at the same time. """
+    assert len(chain) == len(offsets)
+
+    phasedChain = []
+    for task, offset in zip(chain, offsets):
+        phasedTask = copy.copy(task)
+        phasedTask.offset = offset
+        phasedChain.append(phasedTask)
+
+    return phasedChain
+
 def generatePeriodSet(k, numPeriods, maxAllowedPeriod):
     """ Generates (2,k)-max harminc period sets with configurable number of periods and a bound on the maximum allowed period."""
+    periodSets = getPeriodSetCatalog(k, numPeriods, maxAllowedPeriod)
+
+    index = random.randrange(len(periodSets))   # Pick a random period set out of all generated sets
+    set = list(periodSets[index])               # Copy, the catalog is shared by all calls
+
+    return set
+
+def getPeriodSetCatalog(k, numPeriods, maxAllowedPeriod):
+    """ Returns all (2,k)-max harmonic period sets (sorted) with at least numPeriods periods and a maximum period of at most maxAllowedPeriod. 
+        The catalog is computed once per configuration. """
+    return getCatalog(("2kMax", k, numPeriods, maxAllowedPeriod), lambda: computePeriodSetCatalog(k, numPeriods, maxAllowedPeriod))
+
+def computePeriodSetCatalog(k, numPeriods, maxAllowedPeriod):
+    """ Computes the catalog of getPeriodSetCatalog. """
     periodSets = []
+    divisors = getDivisorTable(maxAllowedPeriod)
 
     # Compute all T^E_{max,2} candidates.
     tmax2Candidates = []
@@ -208,23 +618,58 @@ def generatePeriodSet(k, numPeriods, maxAllowedPeriod):
         if tmax2 is not None:
             tmax2Candidates.append([tmax2, tmax1])
     
-    # For each tmax1 and tmax2, we find all possible othe rperiod values.
+    # For each tmax1 and tmax2, the other periods are the common divisors up to tmax1 % tmax2.
     for tmax2, tmax1 in tmax2Candidates:
 
-        # This can be done nicer, just to test...
         tmpPeriodSet = [tmax1, tmax2]
 
-        for i in range(1,(tmax1%tmax2) + 1):
-            if tmax1 % i == 0 and tmax2 % i == 0:
-                tmpPeriodSet.append(i)
+        for i in divisors[math.gcd(tmax1, tmax2)]:
+            if i > tmax1 % tmax2:
+                break
+            tmpPeriodSet.append(i)
 
         if len(tmpPeriodSet) >= numPeriods:
-            periodSets.append(tmpPeriodSet)
+            periodSets.append(sorted(tmpPeriodSet, key=int))    # Sort the periods
 
-    index = random.randrange(len(periodSets))   # Pick a random period set out of all generated sets
-    set = sorted(periodSets[index], key=int)    # Sort the periods
+    return periodSets
 
-    return set
+def getDivisorTable(maxValue):
+    """ Returns a table with the divisors (ascending) of all numbers from 0 to maxValue, computed with a sieve. """
+    if maxValue not in divisorTables:
+        divisors = [[] for _ in range(maxValue+1)]
+        for d in range(1, maxValue+1):
+            for multiple in range(d, maxValue+1, d):
+                divisors[multiple].append(d)
+        divisorTables[maxValue] = divisors
+
+    return divisorTables[maxValue]
+
+def getCatalog(key, compute):
+    """ Returns the catalog of period sets for the key. It is computed with compute() only if it is neither in memory nor 
+        stored in periodSetCacheDir. """
+    if key in periodSetCatalogs:
+        return periodSetCatalogs[key]
+
+    filePath = None
+    if periodSetCacheDir is not None:
+        filePath = os.path.join(periodSetCacheDir, "periodSets_" + "_".join(str(value) for value in key) + ".json")
+
+    if filePath is not None and os.path.isfile(filePath):
+        with open(filePath) as file:
+            catalog = json.load(file)
+    else:
+        catalog = compute()
+
+        if filePath is not None:
+            os.makedirs(periodSetCacheDir, exist_ok=True)
+            tmpPath = filePath + "." + str(os.getpid())     # Write to a temporary file first, so no process reads a partial catalog
+            with open(tmpPath, "w") as file:
+                json.dump(catalog, file)
+            os.replace(tmpPath, filePath)
+
+    periodSetCatalogs[key] = catalog
+
+    return catalog
 
 def getTmax2(k, tmax1):
     """ Computes T^E_{max,2} based on a given value of k and T^E_{max,1}. If the value is not an integer, None is returned. """
@@ -266,23 +711,66 @@ def generateMaxHarmonicPeriodSet(numPeriods, maxAllowedPeriod):
     maxAllowedPeriod. During the generation, all possible period sets are generates that have 
     a length of at least numPeriods. From those the final periods will be selected.
     """
-    allSets = []
-    for i in range(1,maxAllowedPeriod+1):
-        tmpSet = []
-        for k in range(1, i+1):
-            if i % k == 0:
-                tmpSet.append(k)
-        if len(tmpSet) >= numPeriods:
-            allSets.append(tmpSet)
+    allSets = getMaxHarmonicPeriodSetCatalog(numPeriods, maxAllowedPeriod)
     
     index = random.randrange(len(allSets))
-    set = sorted(allSets[index], key=int)
+    set = list(allSets[index])  # Copy, the catalog is shared by all calls
 
     return set
 
+def getMaxHarmonicPeriodSetCatalog(numPeriods, maxAllowedPeriod):
+    """ Returns all max-harmonic period sets (i.e., all divisors of a maximum period up to maxAllowedPeriod) with at least 
+        numPeriods periods. The catalog is computed once per configuration. """
+    def compute():
+        divisors = getDivisorTable(maxAllowedPeriod)
+        return [divisors[i] for i in range(1, maxAllowedPeriod+1) if len(divisors[i]) >= numPeriods]
+
+    return getCatalog(("maxHarmonic", numPeriods, maxAllowedPeriod), compute)
+
 if __name__ == '__main__':
     """ Debugging """
 
+    # Compare the period distributions of the direct samplers and the rejection samplers (chi-square test of homogeneity)
+    from scipy.stats import chi2_contingency
+
+    def generateRandomTasksAutomotiveMaxHarmonic(count, utilization):
+        while True:
+            tasks = generateRandomTasks(count, utilization)
+            if isMaxHarmonic(tasks):
+                return tasks
+
+    def comparePeriodDistributions(name, rejectionSampler, directSampler, samples=20000):
+        counts = {}
+        for column, sampler in enumerate([rejectionSampler, directSampler]):
+            for _ in range(samples):
+                periods = tuple(task.period for task in sampler())
+                counts.setdefault(periods, [0, 0])[column] += 1
+
+        # Merge rare period sequences, so the expected frequency of each cell is large enough for the test
+        table = [c for c in counts.values() if sum(c) >= 20]
+        rare = [sum(c[i] for c in counts.values() if sum(c) < 20) for i in range(2)]
+        if sum(rare) > 0:
+            table.append(rare)
+
+        statistic, pValue, dof, expected = chi2_contingency(table)
+        print("%s: %s period sequences, chi2 = %.1f, dof = %s, p = %.3f" % (name, len(counts), statistic, dof, pValue))
+        assert pValue > 0.001, name + ": distributions differ"
+
+    random.seed(1)
+    comparePeriodDistributions("(2,k)-max harmonic", lambda: generateRandomTasks2kMax(3, 0.5, 3, 3, 60), lambda: generateRandomTasks2kMaxDirect(3, 0.5, 3, 3, 60))
+    comparePeriodDistributions("Max-harmonic", lambda: generateRandomTasksMaxHarmonic(3, 0.5, 4, 24), lambda: generateRandomTasksMaxHarmonicDirect(3, 0.5, 4, 24))
+    comparePeriodDistributions("Automotive max-harmonic", lambda: generateRandomTasksAutomotiveMaxHarmonic(3, 0.5), lambda: generateRandomTasksAutomotiveMaxHarmonicDirect(3, 0.5))
+
+    # The bulk generator has the same distributions, and each chain is independent of the batch it is generated in
+    bulkChains = iter(createChains(*generateChains(20000, 3, "2kMax", 1, k=3, numPeriods=3, maxAllowedPeriod=60)))
+    comparePeriodDistributions("(2,k)-max harmonic (bulk)", lambda: generateRandomTasks2kMax(3, 0.5, 3, 3, 60), lambda: next(bulkChains))
+    bulkChains = iter(createChains(*generateChains(20000, 3, "automotiveMaxHarmonic", 1)))
+    comparePeriodDistributions("Automotive max-harmonic (bulk)", lambda: generateRandomTasksAutomotiveMaxHarmonic(3, 0.5), lambda: next(bulkChains))
+
+    periods, wcets = generateChains(10, 5, "maxHarmonic", 1, numPeriods=4, maxAllowedPeriod=500)
+    periodsPart, wcetsPart = generateChains(3, 5, "maxHarmonic", 1, numPeriods=4, maxAllowedPeriod=500, start=7)
+    assert (periods[7:] == periodsPart).all() and (wcets[7:] == wcetsPart).all()
+
     for i in range(0,10000):
         periods = generatePeriodSet(3, 5, 500)
 
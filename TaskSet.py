@@ -0,0 +1,137 @@
+"""
+This file implements a compact representation of a task set (or chain) where the task parameters
+are stored as int64 arrays instead of a list of Task objects. The helper functions of Task.py are
+provided as vectorized methods on top of it.
+
+* TaskSet.fromTasks(tasks)  -> Create a TaskSet from a list of Task objects
+* TaskSet.toTasks()         -> Create the equivalent list of Task objects
+"""
+from Time import *
+from Task import Task
+import numpy as np
+import math
+import os
+
+class TaskSet:
+    """ Class to represent a set of periodic tasks as arrays. For chains, the order of the tasks is kept. """
+
+    def __init__(self, periods, wcets=None, deadlines=None, offsets=None, priorities=None, responseTimes=None, names=None):
+        self.periods = np.asarray(periods, dtype=np.int64)  # Periods of the tasks
+        count = len(self.periods)
+
+        # Parameters that are not provided default to the task generation: implicit deadlines, no offsets, priority 0
+        self.wcets = self.array(wcets, np.zeros(count))                 # Worst-Case Execution Times of the tasks
+        self.deadlines = self.array(deadlines, self.periods)            # Deadlines of the tasks
+        self.offsets = self.array(offsets, np.zeros(count))             # Offsets of the tasks
+        self.priorities = self.array(priorities, np.zeros(count))       # Priorities of the tasks
+        self.responseTimes = self.array(responseTimes, np.zeros(count)) # Response times of the tasks
+
+        if names is None:
+            names = ["Task_%s" % (id) for id in range(count)]
+        self.names = list(names)                                        # Task names
+
+        assert len(self.names) == count
+
+    def array(self, values, default):
+        """ Helper to convert task parameters to an int64 array of the size of the task set. """
+        if values is None:
+            values = default
+
+        values = np.asarray(values, dtype=np.int64)
+        assert values.shape == self.periods.shape
+
+        return values
+
+    @classmethod
+    def fromTasks(cls, tasks):
+        """ Returns a TaskSet with the parameters of the given list of tasks. """
+        return cls([t.period for t in tasks],
+                   [t.wcet for t in tasks],
+                   [t.deadline for t in tasks],
+                   [t.offset for t in tasks],
+                   [t.priority for t in tasks],
+                   [t.responseTime for t in tasks],
+                   [t.name for t in tasks])
+
+    def toTasks(self):
+        """ Returns the task set as list of Task objects. """
+        tasks = []
+
+        for i in range(len(self)):
+            task = Task(self.names[i], int(self.wcets[i]), int(self.periods[i]), int(self.deadlines[i]), int(self.offsets[i]), int(self.priorities[i]))
+            task.responseTime = int(self.responseTimes[i])
+            tasks.append(task)
+
+        return tasks
+
+    def __len__(self):
+        return len(self.periods)
+
+    def __str__(self):
+        """ Print the task set as chain string. """
+        return " -> ".join(printTime(int(p)) + "/" + printTime(int(o)) for p, o in zip(self.periods, self.offsets))
+
+    def utilization(self):
+        """ Returns the utilization of the task set. """
+        return float(np.sum(self.wcets / self.periods))
+
+    def hyperperiod(self):
+        """ Returns the hyperperiod of the task set. """
+        # The LCM is computed on Python integers, since np.lcm silently overflows for large hyperperiods
+        return math.lcm(*np.unique(self.periods).tolist())
+
+    def getMaxPeriod(self):
+        """ Returns the largest task period. """
+        return int(self.periods.max())
+
+    def getMax2Period(self):
+        """ Returns the second largest period (or 0). """
+        periods = np.unique(self.periods)
+
+        if len(periods) < 2:
+            return 0
+
+        return int(periods[-2])
+
+    def isMaxHarmonic(self):
+        """ Returns true if the task set is max harmonic. I.e. the largest task period can be evenly divided by all other periods. """
+        return bool(np.all(self.getMaxPeriod() % self.periods == 0))
+
+    def is2kMaxHarmonic(self):
+        """ Test if the set of periods is (2,k)-max harmonic. """
+        sortedPeriods = np.unique(self.periods)
+
+        hp = self.hyperperiod()
+
+        max1 = int(sortedPeriods[len(sortedPeriods)-1])
+        max2 = int(sortedPeriods[len(sortedPeriods)-2])
+
+        if max1 * 2 != hp:      # for (2,k)-max harmonic task sets max1 * 2 must be equal to the hyperperiod
+            return False
+
+        if hp % max2 != 0:      # For (2,k)-max harmonic task sets, max2 * k must be equal to the hyperperiod, and k must be integer
+            return False
+
+        others = sortedPeriods[:-2]   # don't check the two largest periods
+
+        return bool(np.all(max1 % others == 0) and np.all(max2 % others == 0))
+
+if __name__ == '__main__':
+    """ Debugging """
+    os.system('cls' if os.name == 'nt' else 'clear')    # Clear the terminal
+
+    task1 = Task('Task1', useconds(1), mseconds(18), mseconds(18), 0)
+    task2 = Task('Task2', useconds(1), mseconds(4), mseconds(4), 0)
+    task3 = Task('Task3', useconds(1), mseconds(4), mseconds(4), 0)
+    task4 = Task('Task4', useconds(1), mseconds(3), mseconds(3), 0)
+
+    chain = [task1, task2, task3, task4]
+
+    taskSet = TaskSet.fromTasks(chain)
+
+    print(taskSet)
+    print("Hyperperiod: " + printTime(taskSet.hyperperiod()))
+    print("Max-Harmonic: " + str(taskSet.isMaxHarmonic()) + " (2,k)-Max-Harmonic: " + str(taskSet.is2kMaxHarmonic()))
+
+    for original, converted in zip(chain, taskSet.toTasks()):
+        assert str(original) == str(converted)
@@ -2,8 +2,8 @@
 Evaluation of the paper "Optimal Task Phasing for End-To-End Latency in
 Harmonic and Semi-Harmonic Automotive Systems".
 
-This is the main file to start the evaluation. For configurations that evaluate synthetic 
-chains, one thread is started for each evaluated chain length. 
+This is the main file to start the evaluation. For configurations that evaluate synthetic
+chains, the chains of each length are split into chunks that are distributed to a process pool.
 Each individual chain is analyzed by several appraoches / in several configurations:
 - DPT Analysis, exact analysis of LET chains by Becker et al. JSA 2017, with offsets
 - The proposed optimal task phasing and analysis (for max harmonic and (2,k)-max harmonic systems)
@@ -18,178 +18,227 @@ The implementation includes assertions to trigger in cases that would violate th
 (i.e. the latency with our proposed optimal phasing is different to the exhaustive heuristic by Martinez et al., etc.)
 """
 from Time import *
-from Task import hyperperiod
+from Task import hyperperiod, generateChains, createChains
 from DPT_Offset import *
 from OptimalPhasing import *
 from Comparison import *
 from MartinezTCAD18 import *
+from Checkpoint import Checkpoint
+from Results import ResultWriter, resultDtype, convertCsvResults, getResultPath, getSchemaPath
 from plotting import *
-import random
 from timeit import default_timer as timer
 from datetime import datetime
 import os
 import shutil
 import psutil
 import argparse
-from multiprocessing import Pool, Manager
+import numpy as np
+from multiprocessing import Pool
+import queue
 import threading
 
-def runConfiguration(seed, length, basePath, expCount, onlyMaxHarmonic, runHeuristic, timeout, expPerDot, q, automotivePeriods, k, numPeriods):
+def runConfiguration(seed, length, basePath, expCount, onlyMaxHarmonic, runHeuristic, timeout, expPerDot, q, automotivePeriods, k, numPeriods, chunkSize=100, heuristicProcesses=1):
     """ 
-    This function is executed as thread and handles all experiments for one chain length. 
-    Output is written to a dedicated CSV-file, and update information is sent to the logger thread.
+    This function handles all experiments for one chain length sequentially (see experiments for the parallel version). 
+    Output is written to dedicated binary result columns (see Results.py), and update information is sent to the logger thread.
     """
-    random.seed(seed)   # For reproducability we use the seed here for each chain length
+    checkpoint = openCheckpoint(basePath, length, getConfig(seed, length, onlyMaxHarmonic, runHeuristic, timeout, automotivePeriods, k, numPeriods))
+    writer = ResultWriter(getResultPath(basePath, length))
 
-    existingResults = 0
+    for first in range(checkpoint.completed + 1, expCount + 1, chunkSize):
+        last = min(first + chunkSize - 1, expCount)
+        length, first, records = runChunk(seed, length, first, last, onlyMaxHarmonic, runHeuristic, timeout, automotivePeriods, k, numPeriods, heuristicProcesses)
+        writeRecords(writer, checkpoint, length, first, records, expPerDot, q)
 
-    # In case the previous experiment was stopped, check how many systems have been processed and contiue from there
-    filePath = basePath + '/length_' + str(length) + '.csv'
-    if os.path.isfile(filePath) is True:
-        existingResults = sum(1 for _ in open(filePath))    # Get the number of results that alredy exist
+    writer.close()
 
-    with open(filePath, "a") as file:
+    q.put([length, " -> Finished"])
 
-        bestRatio = 1000000
-        worstRatio = 0
+def openCheckpoint(basePath, length, config):
+    """ Returns the checkpoint of the results of the chain length. Results of older experiments (CSV-files) are converted first. """
+    csvPath = basePath + '/length_' + str(length) + '.csv'
+    if os.path.isfile(csvPath) and not os.path.isfile(getSchemaPath(getResultPath(basePath, length))):
+        convertCsvResults(csvPath, getResultPath(basePath, length))
 
-        for i in range(1, expCount+1):                      # Each experiment for the chain length
+    return Checkpoint(getResultPath(basePath, length), config)
 
-            if i % expPerDot == 0:                          # This is only to plot some crude progress bar
-                q.put([length, "."])
+def getConfig(seed, length, onlyMaxHarmonic, runHeuristic, timeout, automotivePeriods, k, numPeriods):
+    """ Returns the configuration of the results of one chain length that is stored in the checkpoint. 
+        In case the previous experiment was stopped, it only continues if the configuration is the same. """
+    return {"seed": seed, "length": length, "onlyMaxHarmonic": onlyMaxHarmonic, "runHeuristic": runHeuristic, "timeout": timeout, 
+            "automotivePeriods": automotivePeriods, "k": k, "numPeriods": numPeriods}
 
-            # Generate a random chain of the given length with max harmonic periods. This is always needed for reproducable results!
-            if onlyMaxHarmonic == True:
-                maxHarmonic = False
-                while maxHarmonic is False:
-                    if automotivePeriods == True:
-                        chain = generateRandomTasks(length, 0.5)        # Utilization does not matter since we focus on LET
-                    else:
-                        chain = generateRandomTasks2kMax(length, 0.5, k, numPeriods, 200)  # Utilization does not matter since we focus on LET
+def writeRecords(writer, checkpoint, length, first, records, expPerDot, q):
+    """ Appends the records of the chains first, first+1, ... to the results, updates the checkpoint and the progress bar. """
+    writer.extend(records)
+    writer.flush()
 
-                    maxHarmonic = isMaxHarmonic(chain)          # Only keep max harmoic chains
-            else:
-                if automotivePeriods == True:
-                    chain = generateRandomTasks(length, 0.5)        # Utilization does not matter since we focus on LET
-                else:
-                    if k is None:
-                        chain = generateRandomTasksMaxHarmonic(length, 0.5, numPeriods, 500) # Utilization does not matter since we focus on LET
-                    else:
-                        chain = generateRandomTasks2kMax(length, 0.5, k, numPeriods, 500)  # Utilization does not matter since we focus on LET
-                maxHarmonic = isMaxHarmonic(chain)
-
-            hp = hyperperiod(chain)
-
-            if i > existingResults:                         # Only run the analysis if results don't exist yet
-
-                #############################
-                # DPT analysis 
-                #############################
-                startDpt = timer()
-                dpt = DPT(chain)
-                dpt.getDpt()
-                synchronousLatency = dpt.maxAge / hp
-                durDpt = timer() - startDpt
-
-                #############################
-                # Optimal Phasing
-                #############################
-                if maxHarmonic:
-                    startOpt = timer()
-                    optPhasingLatency = optimalPhasingMaxHarm(chain) / hp
-                    durOpt = timer() - startOpt
-                else:
-                    startOpt = timer()
-                    optPhasingLatency = optimalPhasing2kMaxHarm(chain) / hp
-                    durOpt = timer() - startOpt
-
-                #############################
-                # DPT analysis with phasing 
-                #############################
-                startDptOffset = timer()
-                dptOffset = DPT(chain)
-                dptOffset.getDpt()
-                offsetLatency = dptOffset.maxAge / hp
-                durDptOffset = timer() - startDptOffset
-
-                #############################
-                # Martinez TCAD'18 
-                #############################
-                startMartinez = timer()
-                martinezLatency = calculateLatencyMartinezTCAD18(chain) / hp
-                durMartinez = timer() - startMartinez
-
-                #############################
-                # Davare bound, i.e. worst-case phasing
-                #############################
-                startDavare = timer()
-                davareLatency = davareBound(chain) / hp
-                durDavare = timer() - startDavare
-
-                #############################
-                # Random phasing between tasks
-                #############################
-                startRandomPhasing = timer()
-                randomPhasing(chain, seed)
-                rndPhasingDpt = DPT(chain)
-                rndPhasingDpt.getDpt()
-                rndPhasingLatency = rndPhasingDpt.maxAge / hp
-                durRandomPhasing = timer() - startRandomPhasing
-
-                #############################
-                # Combinations Offset Heuristic
-                #############################
-                numAssignments = combinationsHeuristic(chain, getMaxDeltaHeuristic(chain))
-                    
-                #############################
-                # Offset Heuristic Martinez et al.
-                #############################
-                if runHeuristic:
-                    startOffsetHeuristic = timer()
-                    if timeout > 0:
-                        heuristicLatency = heuristicOptimalPhasingTimeout(chain, mseconds(1), timeout)
-                        if heuristicLatency > 0:    # -1 is returned in case of a timeout
-                            heuristicLatency = heuristicLatency / hp
-                            
-                            # Make sure that the offset heuristic latency is the same as our optimal latency
-                            assert optPhasingLatency == heuristicLatency, chainString(chain) + " Optimal Phasing Latency: " + printTime(optPhasingLatency) + " Offset Heuristic Latency: " + printTime(heuristicLatency)                            
-                    else:
-                        heuristicLatency = heuristicOptimalPhasing(chain, mseconds(1)) / hp
-                    durOffsetHeuristic = timer() - startOffsetHeuristic
-                else:
-                    heuristicLatency = -1
-                    durOffsetHeuristic = -1
-
-                # Make sure the optimal phasing is always smaller or equal than the synchronous release
-                assert optPhasingLatency <= synchronousLatency, chainString(chain) + " Optimal Phasing Latency: " + printTime(optPhasingLatency) + " Synchronous Latency: " + printTime(synchronousLatency)
-
-                # Make sure the optimal phasing is always smaller or equal than the random phasing
-                assert optPhasingLatency <= rndPhasingLatency, chainString(chain) + " Optimal Phasing Latency: " + printTime(optPhasingLatency) + " Random Phasing Latency: " + printTime(rndPhasingLatency)
-
-                # Make sure the latency by Martinez TCAD'18 is the same as Becker JSA'17
-                assert martinezLatency == offsetLatency, "Latency Martinez TCAD'18: " + printTime(martinezLatency) + " Latency Becker JSA'17: " + printTime(offsetLatency) + " Chain: " + chainString(chain)
-
-                # Make sure that the latency we compute with the proposed phasing is always equal to the exact analysis
-                assert optPhasingLatency == offsetLatency, chainString(chain) + " Optimal Phasing Latency: " + printTime(optPhasingLatency) + " Offset Latency: " + printTime(offsetLatency)
-
-                ratio = optPhasingLatency / synchronousLatency 
-                if ratio < bestRatio:
-                    bestRatio = ratio
-
-                if ratio > worstRatio:
-                    worstRatio = ratio
-
-                file.write(str(i) + ',' + "{:.6f}".format(synchronousLatency) + ',' + "{:.6f}".format(durDpt) + ',' 
-                           + "{:.6f}".format(optPhasingLatency) + ',' + "{:.6f}".format(durOpt) + ',' 
-                           + "{:.6f}".format(offsetLatency) + ',' + "{:.6f}".format(durDptOffset) + ',' 
-                           + "{:.6f}".format(davareLatency) + ',' + "{:.6f}".format(durDavare) + ',' 
-                           + "{:.6f}".format(rndPhasingLatency) + ',' + "{:.6f}".format(durRandomPhasing) + ','
-                           + "{:.6f}".format(martinezLatency) + ',' + "{:.6f}".format(durMartinez) + ','
-                           + "{:.6f}".format(heuristicLatency) + ',' + "{:.6f}".format(durOffsetHeuristic) + ','
-                           + str(numAssignments) + ',' + str(maxHarmonic) + '\n')
+    checkpoint.add(records)
+    checkpoint.save()
+
+    putProgress(q, length, first, len(records), expPerDot)
+
+def putProgress(q, length, first, count, expPerDot):
+    """ Sends the progress of the chains first to first+count-1 to the logger thread. """
+    for i in range(first, first + count):
+        if i % expPerDot == 0:                          # This is only to plot some crude progress bar
+            q.put([length, "."])
+
+def getChunks(nextIndex, expCount, chunkSize):
+    """ Splits the chains that don't have results yet into chunks (chain length, first, last) of at most chunkSize chains. 
+        The chunks are ordered longest chain length first, since the runtime grows with the chain length. """
+    chunks = []
+
+    for length in sorted(nextIndex, reverse=True):
+        for first in range(nextIndex[length], expCount + 1, chunkSize):
+            chunks.append((length, first, min(first + chunkSize - 1, expCount)))
+
+    return chunks
+
+def runChunkData(data):
+    """ Wrapper of runChunk for Pool.imap_unordered. """
+    return runChunk(*data)
+
+def runChunk(seed, length, first, last, onlyMaxHarmonic, runHeuristic, timeout, automotivePeriods, k, numPeriods, heuristicProcesses=1):
+    """ 
+    Analyzes the chains first to last (including) of the chain length, and returns (length, first, records) with one record per chain. 
+    Each chain is generated from its own random stream (seed, length, index), i.e., chain i is the same no matter 
+    how the experiment is split into chunks or where it is resumed.
+    """
+    if onlyMaxHarmonic == True:
+        assert automotivePeriods == True, "Only automotive periods can be restricted to max harmonic chains, (2,k)-max harmonic chains are never max harmonic"
+        periodModel = "automotiveMaxHarmonic"
+    elif automotivePeriods == True:
+        periodModel = "automotive"
+    elif k is None:
+        periodModel = "maxHarmonic"
+    else:
+        periodModel = "2kMax"
+
+    periods, wcets = generateChains(last - first + 1, length, periodModel, seed, 0.5, k, numPeriods, 500, start=first) # Utilization does not matter since we focus on LET
+    records = np.zeros(last - first + 1, dtype=resultDtype)
+
+    for i, chain in enumerate(createChains(periods, wcets), first):   # Each experiment of the chunk
+        maxHarmonic = isMaxHarmonic(chain)
+        hp = hyperperiod(chain)
+
+        #############################
+        # DPT analysis 
+        #############################
+        # The analyses don't change the chain, the offsets of each phasing are passed explicitly
+        syncOffsets = getOffsets(chain)
+
+        startDpt = timer()
+        synchronousLatency = getMaxAgeDpt(chain, syncOffsets) / hp
+        durDpt = timer() - startDpt
+
+        #############################
+        # Optimal Phasing
+        #############################
+        if maxHarmonic:
+            startOpt = timer()
+            optOffsets, optPhasingLatency = getOptimalOffsetsMaxHarm(chain)
+            optPhasingLatency = optPhasingLatency / hp
+            durOpt = timer() - startOpt
+        else:
+            startOpt = timer()
+            optOffsets, optPhasingLatency = getOptimalOffsets2kMaxHarm(chain)
+            optPhasingLatency = optPhasingLatency / hp
+            durOpt = timer() - startOpt
+
+        #############################
+        # DPT analysis with phasing 
+        #############################
+        startDptOffset = timer()
+        offsetLatency = getMaxAgeDpt(chain, optOffsets) / hp
+        durDptOffset = timer() - startDptOffset
+
+        #############################
+        # Martinez TCAD'18 
+        #############################
+        startMartinez = timer()
+        martinezLatency = calculateLatencyMartinezTCAD18Offsets(chain, optOffsets) / hp
+        durMartinez = timer() - startMartinez
+
+        #############################
+        # Davare bound, i.e. worst-case phasing
+        #############################
+        startDavare = timer()
+        davareLatency = davareBound(chain) / hp
+        durDavare = timer() - startDavare
+
+        #############################
+        # Random phasing between tasks
+        #############################
+        startRandomPhasing = timer()
+        rndOffsets = getRandomOffsets(chain, seed)
+        rndPhasingLatency = getMaxAgeDpt(chain, rndOffsets) / hp
+        durRandomPhasing = timer() - startRandomPhasing
+
+        #############################
+        # Combinations Offset Heuristic
+        #############################
+        numAssignments = combinationsHeuristic(chain, getMaxDeltaHeuristic(chain))
                     
-        file.close()
-        q.put([length, " -> Finished"])
+        #############################
+        # Offset Heuristic Martinez et al.
+        #############################
+        if runHeuristic:
+            # The anytime search reports the best latency found so far, also if the timeout stops it before the tree is complete
+            heuristicProgress = []          # Progress reports, the last one is the final result
+            heuristicChain = withOffsets(chain, syncOffsets)
+
+            startOffsetHeuristic = timer()
+            if heuristicProcesses > 1:      # The offset tree is split between several processes (only without timeout)
+                latency = heuristicOptimalPhasingParallel(heuristicChain, mseconds(1), heuristicProcesses, prune=False)
+                total = getEndNodeCounts(chain, mseconds(1))[1]
+                heuristicProgress.append(HeuristicProgress(total, total, latency, getOffsets(heuristicChain), latencyLowerBound(chain), timer() - startOffsetHeuristic))
+            else:
+                heuristicOptimalPhasingAnytime(heuristicChain, mseconds(1), heuristicProgress.append, interval=max(timeout, 1), prune=False, 
+                                               timeout_s=timeout if timeout > 0 else None)
+            durOffsetHeuristic = timer() - startOffsetHeuristic
+
+            progress = heuristicProgress[-1]
+            heuristicExplored = progress.explored
+            heuristicTotal = progress.total
+
+            if progress.bestLatency is None:    # Timeout before the first end node was analyzed
+                heuristicBestLatency = -1
+                heuristicGap = -1
+            else:
+                heuristicBestLatency = progress.bestLatency / hp
+                heuristicGap = progress.gap()
+
+            if progress.explored < progress.total:
+                heuristicLatency = -1           # Only the complete search is comparable to the optimal phasing
+            else:
+                heuristicLatency = heuristicBestLatency     # Can differ from optPhasingLatency, the heuristic only explores offsets up to the gcd
+        else:
+            heuristicLatency = -1
+            durOffsetHeuristic = -1
+            heuristicBestLatency = -1
+            heuristicExplored = 0
+            heuristicTotal = 0
+            heuristicGap = -1
+
+        # Make sure the optimal phasing is always smaller or equal than the synchronous release
+        assert optPhasingLatency <= synchronousLatency, chainString(chain) + " Optimal Phasing Latency: " + printTime(optPhasingLatency) + " Synchronous Latency: " + printTime(synchronousLatency)
+
+        # Make sure the optimal phasing is always smaller or equal than the random phasing
+        assert optPhasingLatency <= rndPhasingLatency, chainString(chain) + " Optimal Phasing Latency: " + printTime(optPhasingLatency) + " Random Phasing Latency: " + printTime(rndPhasingLatency)
+
+        # Make sure the latency by Martinez TCAD'18 is the same as Becker JSA'17
+        assert martinezLatency == offsetLatency, "Latency Martinez TCAD'18: " + printTime(martinezLatency) + " Latency Becker JSA'17: " + printTime(offsetLatency) + " Chain: " + chainString(withOffsets(chain, optOffsets))
+
+        # Make sure that the latency we compute with the proposed phasing is always equal to the exact analysis
+        assert optPhasingLatency == offsetLatency, chainString(chain) + " Optimal Phasing Latency: " + printTime(optPhasingLatency) + " Offset Latency: " + printTime(offsetLatency)
+
+        records[i - first] = (i, synchronousLatency, durDpt, optPhasingLatency, durOpt, offsetLatency, durDptOffset, 
+                              davareLatency, durDavare, rndPhasingLatency, durRandomPhasing, martinezLatency, durMartinez, 
+                              heuristicLatency, durOffsetHeuristic, numAssignments, maxHarmonic, 
+                              heuristicBestLatency, heuristicExplored, heuristicTotal, heuristicGap)
+
+    return length, first, records
 
 def logger_thread(q, start, stop, step):
     """ This is the logger thread that collects the update information from each experiment thread to 
@@ -224,11 +273,13 @@ def logger_thread(q, start, stop, step):
 
     stepChainLength = 2                         # Step between two examined chain length
     
-def experiments(destinationFolder, seed, onlyMaxHarmonic, runHeuristic, timeout, expCount, minChainLength, maxChainLength, stepChainLength, numCpu, automotivePeriods, k, numPeriods):
+def experiments(destinationFolder, seed, onlyMaxHarmonic, runHeuristic, timeout, expCount, minChainLength, maxChainLength, stepChainLength, numCpu, automotivePeriods, k, numPeriods, chunkSize=100, heuristicProcesses=1):
     """
     This function executes the experiments with cause-effect chains that have automotive periods. 
     The chain length is varied from minChainLength to maxChainLength, and for each setting expCount random chains are examined.
-    A threadpool is used the size of the physical CPUs - 1. Each chain length is dispatched to a thread.
+    A process pool is used the size of the physical CPUs - 1. The chains are split into chunks of at most chunkSize chains 
+    of one chain length, which are dispatched to the processes. If the offset heuristic uses more than one process 
+    (heuristicProcesses), the chunks are analyzed one after the other and the offset tree of each chain is explored in parallel.
     """
     expStart = datetime.now()
     print("Start at:", expStart.strftime("%d/%m/%Y %H:%M:%S"))
@@ -261,20 +312,59 @@ def experiments(destinationFolder, seed, onlyMaxHarmonic, runHeuristic, timeout,
     print("Using thread pool with " + str(numCpu) + " CPUs.")
     pool = Pool(processes=numCpu)    # Create a thread pool
 
-    threadData = []
-    m = Manager()
-    q = m.Queue()
-
-    for length in range(minChainLength, maxChainLength+1, stepChainLength): # Each chain length
-        tmp = (seed, length, basePath, expCount, onlyMaxHarmonic, runHeuristic, timeout, expPerDot, q, automotivePeriods, k, numPeriods)
-        threadData.append(tmp)
-        #runConfiguration(seed, length, basePath, expCount, onlyMaxHarmonic, runHeuristic)
+    q = queue.Queue()
 
-    
     lp = threading.Thread(target=logger_thread, args=(q,minChainLength, maxChainLength, stepChainLength))
     lp.start()
-    result = pool.starmap(runConfiguration, threadData) # Run a thread for each configuration, i.e. chain length. This is blocking!
-    q.put(None) # Tell the logging thread to finish
+
+    lengths = range(minChainLength, maxChainLength+1, stepChainLength)
+    pendingRecords = {length: {} for length in lengths} # Finished chunks that wait for their predecessors
+    checkpoints = {}                                    # Checkpoints of the results, a stopped experiment continues at the first missing chain
+    writers = {}
+
+    # If an analysis fails, the workers and the logging thread are stopped as well, so the experiment doesn't hang
+    try:
+        for length in lengths:
+            checkpoints[length] = openCheckpoint(basePath, length, getConfig(seed, length, onlyMaxHarmonic, runHeuristic, timeout, automotivePeriods, k, numPeriods))
+            writers[length] = ResultWriter(getResultPath(basePath, length))
+
+        for length in lengths:
+            putProgress(q, length, 1, checkpoints[length].completed, expPerDot)    # Results of a previous run
+            if checkpoints[length].completed >= expCount:
+                q.put([length, " -> Finished"])
+
+        # The chunks are distributed dynamically to the workers, longest chain length first. The records of each chain length 
+        # are written in the order of the chain index, so the result files don't depend on the scheduling.
+        chunkData = []
+        nextIndex = {length: checkpoints[length].completed + 1 for length in lengths}
+        for length, first, last in getChunks(nextIndex, expCount, chunkSize):
+            chunkData.append((seed, length, first, last, onlyMaxHarmonic, runHeuristic, timeout, automotivePeriods, k, numPeriods, heuristicProcesses))
+
+        if heuristicProcesses > 1:
+            results = map(runChunkData, chunkData)  # Analyzed in this process, the daemonic workers of the pool can't start processes
+        else:
+            results = pool.imap_unordered(runChunkData, chunkData)
+
+        for length, first, records in results:
+            pendingRecords[length][first] = records
+
+            while checkpoints[length].completed + 1 in pendingRecords[length]:
+                first = checkpoints[length].completed + 1
+                writeRecords(writers[length], checkpoints[length], length, first, pendingRecords[length].pop(first), expPerDot, q)
+
+                if checkpoints[length].completed >= expCount:
+                    q.put([length, " -> Finished"])
+
+        pool.close()
+        pool.join()
+    finally:
+        pool.terminate()    # Only stops workers that are still running, i.e., after a failed analysis
+
+        for writer in writers.values():
+            writer.close()
+
+        q.put(None) # Tell the logging thread to finish
+        lp.join()
 
     os.makedirs(dstPath, exist_ok=True)    # Create plots folder if it does not exist   
     plot(basePath, dstPath, minChainLength, maxChainLength, stepChainLength)
@@ -461,13 +551,15 @@ def main():
     parser.add_argument("-ap", "--automotivePeriods", help="Set flag to run the experiment with automotive periods.", action="store_true")
 
     parser.add_argument("-heur","--heuristic", help="Set to true to enable the offset heuristic of Martinez et al. TCAD'18 (long runtime).", action="store_true")
-    parser.add_argument("-to","--timeout", help="Timeout for the heuristic. (!!!Experimental, aborted threads don't clean up properly which can lead to memory problems!!!)", type=int)
+    parser.add_argument("-to","--timeout", help="Timeout for the heuristic in seconds. On a timeout the search is stopped and the chain is not compared to the optimal phasing.", type=int)
     parser.add_argument("-min","--minlength", help="Minimum length of generated chains.", type=int)
     parser.add_argument("-max","--maxlength", help="Maximum length of generated chains.", type=int)
     parser.add_argument("-inc","--incrementlength", help="Step between two examined chain length.", type=int)
     parser.add_argument("-exp","--experimentCount", help="Number of experiments for each configuration and data point.", type=int)
     parser.add_argument("-sed","--seed", help="Seed for the random number generator.", type=int)
     parser.add_argument("-k","--kValue", help="(2,k)-max harmonic periods.", type=int)
+    parser.add_argument("-cz","--chunkSize", help="Number of chains that are analyzed by a worker at once (default 100).", type=int, default=100)
+    parser.add_argument("-hp","--heuristicProcesses", help="Number of processes that explore the offset tree of one chain with the heuristic (default 1). With more than one process, the chains are analyzed one after the other (not with --timeout).", type=int, default=1)
     parser.add_argument("-np","--numPeriods", help="Minimum number of periods with random (2,k)-max harmonic periods in period sets during generation.", type=int)
 
     args = parser.parse_args()
@@ -495,6 +587,10 @@ def main():
         else:
             timeout = 0
 
+        if args.heuristicProcesses > 1 and timeout > 0:
+            print("--heuristicProcesses can't be combined with --timeout.")
+            return
+
         if args.experimentCount is not None:
             expCount = args.experimentCount             # Number of experiments for each configuration and data point
         else:
@@ -543,7 +639,7 @@ def main():
             k = 0
             numPeriods = 0
 
-        experiments(destinationFolder, seed, onlyMaxHarmonic, runHeuristic, timeout, expCount, minChainLength, maxChainLength, stepChainLength, numCpu, automotivePeriods, k, numPeriods)
+        experiments(destinationFolder, seed, onlyMaxHarmonic, runHeuristic, timeout, expCount, minChainLength, maxChainLength, stepChainLength, numCpu, automotivePeriods, k, numPeriods, args.chunkSize, args.heuristicProcesses)
 
     if runCaseStudy:
         caseStudy(destinationFolder)
@@ -7,11 +7,11 @@ import matplotlib as mpl
 import matplotlib.pyplot as plt
 from matplotlib.patches import Rectangle
 import numpy as np
-import csv
 import os
 import argparse
 from pathlib import Path
 import warnings 
+from Results import readResults, getResultFiles, appendResults, convertCsvResults, getSchemaPath
 
 warnings.filterwarnings("ignore")  # Tick labels for some boxplots are arranges manually which creates warnings. Those are turned off here. 
 
@@ -48,152 +48,127 @@ def configure_mpl_for_tex():
     }
     mpl.rcParams.update(settings)
 
+resultCache = {}    # (files, DataFrame) of the results, keyed by (data folder, length), see loadResults
+
+def loadResults(dataFolder, length):
+    """ Returns the results of the chain length as DataFrame (one row per chain, columns see Results.py), or None if there 
+        are no results. The results are only read once, until one of their files is changed (modification time or size). """
+    paths = getResultFiles(dataFolder, length)
+    if paths is None:
+        return None
+
+    files = [(path, os.stat(path).st_mtime_ns, os.stat(path).st_size) for path in paths]
+    key = (os.path.abspath(dataFolder), length)
+
+    if key not in resultCache or resultCache[key][0] != files:
+        columns = readResults(dataFolder, length)
+        resultCache[key] = (files, pd.DataFrame({name: np.array(column) for name, column in columns.items()}))  # Copy, the files are not kept open
+
+    return resultCache[key][1]
+
+def loadResultsRange(dataFolder, start, stop, step):
+    """ Returns the results of all chain lengths (that have results) as one DataFrame with the additional column 'length'. """
+    frames = []
+
+    for length in range(start, stop+1, step):
+        df = loadResults(dataFolder, length)
+        if df is not None:
+            frames.append(df.assign(length=length))
+
+    return pd.concat(frames, ignore_index=True)
+
 def getMinRuntimeOurs(dataFolder, length):
-    minRuntime = 100
-    filename = dataFolder + "/length_" + str(length) + ".csv"
-    with open(filename,'r') as csvfile: 
-        data = csv.reader(csvfile, delimiter = ',') 
-        for row in data: 
-            runtime = float((row[4]))
-            if minRuntime > runtime:
-                minRuntime = runtime
-    return minRuntime
+    df = loadResults(dataFolder, length)
+    return min(100, df['durOpt'].min())
 
 def getMaxRuntimeOurs(dataFolder, length):
-    maxRuntime = 0
-    filename = dataFolder + "/length_" + str(length) + ".csv"
-    with open(filename,'r') as csvfile: 
-        data = csv.reader(csvfile, delimiter = ',') 
-        for row in data: 
-            runtime = float((row[4]))
-            if maxRuntime < runtime:
-                maxRuntime = runtime
-    return maxRuntime
+    df = loadResults(dataFolder, length)
+    return max(0, df['durOpt'].max())
 
 def getAvrgRuntimeOurs(dataFolder, length):
-    runtime = []
-    filename = dataFolder + "/length_" + str(length) + ".csv"
-    with open(filename,'r') as csvfile: 
-        data = csv.reader(csvfile, delimiter = ',') 
-        for row in data: 
-            runtime.append(float((row[4])))
-
-    return np.average(runtime)
+    df = loadResults(dataFolder, length)
+    return df['durOpt'].mean()
+
+""" Approaches of the individual plots: (name, latency column, runtime column). """
+individualApproaches = [
+    ('Worst-Case Phasing', 'davareLatency', 'durDavare'),
+    ('Syncronous Release', 'synchronousLatency', 'durDpt'),
+    ('Optimal Phasing', 'optPhasingLatency', 'durOpt'),
+    #('OFFSET_EXP', 'offsetLatency', 'durDptOffset'),
+    ('Random Phasing', 'rndPhasingLatency', 'durRandomPhasing'),
+    ('Martinez_Latency', 'martinezLatency', 'durMartinez'),
+    ('SOTA Heuristic [27]', 'heuristicLatency', 'durOffsetHeuristic'),
+]
 
 def readDataFrameIndividual(dataFolder, length):
     """ Reads the data for individual appraoches. """
-    outputData = []
-
-    filename = dataFolder + "/length_" + str(length) + ".csv"
-
-    pFilename = Path(filename)
-    if pFilename.is_file() is False:
+    df = loadResults(dataFolder, length)
+    if df is None:
         return None
 
-    with open(filename,'r') as csvfile: 
-        data = csv.reader(csvfile, delimiter = ',') 
-        for row in data: 
-            outputData.append(['Worst-Case Phasing', length, float((row[7])), float((row[8]))])
-            outputData.append(['Syncronous Release', length, float((row[1])), float((row[2]))])
-            outputData.append(['Optimal Phasing', length, float((row[3])), float((row[4]))])
-            #outputData.append(['OFFSET_EXP', length, float((row[5])), float((row[6]))])
-            outputData.append(['Random Phasing', length, float((row[9])), float((row[10]))])
-            outputData.append(['Martinez_Latency', length, float((row[11])), float((row[12]))])
-            if float((row[13])) > 0:    # If the heuristic is not executed in the experiment config a value of -1 is written
-                outputData.append(['SOTA Heuristic [27]', length, float((row[13])), float((row[14]))])
-            
-            martinezAnalysisDur = float((row[11]))
-            combinations = int(row[15]) # Number of combinations to check
-            outputData.append(['Heuristic Est. [27]', length, 0.0, combinations * martinezAnalysisDur])
-
-            assert row[3] == row[5]
-    
-    return outputData
+    assert (df['optPhasingLatency'] == df['offsetLatency']).all()
 
-def readDataFrameRatio(dataFolder, length):
+    frames = []
+    for name, latency, runtime in individualApproaches:
+        frame = pd.DataFrame({'Approach': name, 'Latency [$H$]': df[latency], 'Runtime [s]': df[runtime], 'Chain': np.arange(len(df))})
+        if latency == 'heuristicLatency':
+            frame = frame[frame['Latency [$H$]'] > 0]    # If the heuristic is not executed in the experiment config a value of -1 is written
+        frames.append(frame)
 
-    outputData = []
+    # Estimated runtime of the heuristic: number of combinations to check times the value of the Martinez analysis
+    frames.append(pd.DataFrame({'Approach': 'Heuristic Est. [27]', 'Latency [$H$]': 0.0, 'Runtime [s]': df['combinations'].astype(float) * df['martinezLatency'], 'Chain': np.arange(len(df))}))
 
-    filename = dataFolder + "/length_" + str(length) + ".csv"
+    # Rows are ordered by chain (as the approaches of each chain were appended before), so the order of the approaches in the plots is kept
+    output = pd.concat(frames).sort_values('Chain', kind='stable')
+    output.insert(1, 'Cause-Effect Chain Length', length)
 
-    pFilename = Path(filename)
-    if pFilename.is_file() is False:
-        return None
-    
-    with open(filename,'r') as csvfile: 
-        data = csv.reader(csvfile, delimiter = ',') 
-        for row in data: 
-            outputData.append(['Improvement', length, float((row[3])) / float((row[1]))])
-    
-    return outputData
+    return output.drop(columns='Chain').reset_index(drop=True)
 
-def readMaxHarmRatio(dataFolder, length):
-    total = 0
-    maxHarm = 0
+def readDataFrameRatio(dataFolder, length):
+    df = loadResults(dataFolder, length)
+    if df is None:
+        return None
 
-    filename = dataFolder + "/length_" + str(length) + ".csv"
-    with open(filename,'r') as csvfile: 
-        data = csv.reader(csvfile, delimiter = ',') 
-        for row in data: 
-            if row[16] == 'False':
-                maxHarm = maxHarm + 1
-            total = total + 1
+    return pd.DataFrame({'Approach': 'Improvement', 'Cause-Effect Chain Length': length, 'Optimal / Synchronous': df['optPhasingLatency'] / df['synchronousLatency']})
 
-    return maxHarm
+def readMaxHarmRatio(dataFolder, length):
+    df = loadResults(dataFolder, length)
+    return int((~df['maxHarmonic']).sum())      # Number of chains that are not max-harmonic
 
 def readMaxHarmRatioData(dataFolder, start, stop, step):
     outputData = []
-    for length in range(start, stop+1, step):   # Read data from CSV files.
+    for length in range(start, stop+1, step):   # Read data from result files.
         outputData.append(readMaxHarmRatio(dataFolder, length))
 
     return outputData
 
 def readOffsetHeuristicData(dataFolder, start, stop, step):
-
+    df = loadResultsRange(dataFolder, start, stop, step)
+    return [['Heuristic', length, int(combinations)] for length, combinations in zip(df['length'].tolist(), df['combinations'].tolist())]
+
+""" Approaches of the average plots: (name, latency column). """
+averageApproaches = [
+    ('Worst-Case Phasing', 'davareLatency'),
+    ('Syncronous Release', 'synchronousLatency'),
+    ('Optimal Phasing', 'optPhasingLatency'),
+    ('Random Phasing', 'rndPhasingLatency'),
+]
+
+def getAverageData(averages):
+    """ Returns the rows [approach, average, length] for the averages (DataFrame indexed by chain length). """
     outputData = []
 
-    for length in range(start, stop+1, step):   # Read data from CSV files.
-        filename = dataFolder + "/length_" + str(length) + ".csv"
-        with open(filename,'r') as csvfile: 
-            data = csv.reader(csvfile, delimiter = ',') 
-            for row in data: 
-                outputData.append(['Heuristic', length, int(row[15])])
-    
+    for length, row in averages.iterrows():
+        for name, latency in averageApproaches:
+            outputData.append([name, row[latency], length])
+
     return outputData
 
 def readAverageValues(dataFolder, start, stop, step):
+    df = loadResultsRange(dataFolder, start, stop, step)
+    columns = [latency for _, latency in averageApproaches]
 
-    outputData = []
-
-    for length in range(start, stop+1, step):   # Read data from CSV files. 
-
-        filename = dataFolder + "/length_" + str(length) + ".csv"
-
-        avrgSync = 0
-        avrgOpt = 0
-        avrgWorst = 0
-        avrgRnd = 0
-        count = 0
-
-        with open(filename,'r') as csvfile: 
-            data = csv.reader(csvfile, delimiter = ',') 
-            for row in data: 
-                avrgSync = avrgSync + float((row[1]))
-                avrgOpt = avrgOpt + float((row[3]))
-                avrgWorst = avrgWorst + float((row[7]))
-                avrgRnd = avrgRnd + float((row[9]))
-                count = count + 1
-        
-        avrgSync = avrgSync / count
-        avrgOpt = avrgOpt / count
-        avrgWorst = avrgWorst / count
-        avrgRnd = avrgRnd / count
-
-        outputData.append(['Worst-Case Phasing', avrgWorst, length])
-        outputData.append(['Syncronous Release', avrgSync, length])
-        outputData.append(['Optimal Phasing', avrgOpt, length])
-        outputData.append(['Random Phasing', avrgRnd, length])
-    return outputData
+    return getAverageData(df.groupby('length')[columns].mean())
 
 def geo_mean(iterable):
     """ Compute the geometric mean. Using mapping to log domain to avoid overflow as described here:
@@ -203,90 +178,36 @@ def geo_mean(iterable):
     return np.exp(np.log(a).mean())
 
 def readAverageValuesGeometric(dataFolder, start, stop, step):
+    df = loadResultsRange(dataFolder, start, stop, step)
+    columns = [latency for _, latency in averageApproaches]
 
-    outputData = []
-
-    for length in range(start, stop+1, step):   # Read data from CSV files. 
-
-        filename = dataFolder + "/length_" + str(length) + ".csv"
-
-        sync = []
-        opt = []
-        worst = []
-        rnd = []
-
-        with open(filename,'r') as csvfile: 
-            data = csv.reader(csvfile, delimiter = ',') 
-            for row in data: 
-                sync.append(float((row[1])))
-                opt.append(float((row[3])))
-                worst.append(float((row[7])))
-                rnd.append(float((row[9])))
-        
-        avrgSync = geo_mean(sync)
-        avrgOpt = geo_mean(opt)
-        avrgWorst = geo_mean(worst)
-        avrgRnd = geo_mean(rnd)
-
-        outputData.append(['Worst-Case Phasing', avrgWorst, length])
-        outputData.append(['Syncronous Release', avrgSync, length])
-        outputData.append(['Optimal Phasing', avrgOpt, length])
-        outputData.append(['Random Phasing', avrgRnd, length])
-    return outputData
+    return getAverageData(np.exp(np.log(df[columns]).groupby(df['length']).mean()))    # Geometric mean, see geo_mean
 
 def getImprovementForChainLength(dataFolder, length) :
-
-    imp = []
-    filename = dataFolder + "/length_" + str(length) + ".csv"
-
-    with open(filename,'r') as csvfile: 
-            data = csv.reader(csvfile, delimiter = ',') 
-            for row in data: 
-                sync = float((row[1]))
-                opt = float((row[3]))
-                imp.append(opt/sync)
-    
-    return np.average(imp)
+    df = loadResults(dataFolder, length)
+    return (df['optPhasingLatency'] / df['synchronousLatency']).mean()
 
 def getMaxImprovementForChainLength(dataFolder, length) :
-    filename = dataFolder + "/length_" + str(length) + ".csv"
-    maxImp = 100000
-    with open(filename,'r') as csvfile: 
-            data = csv.reader(csvfile, delimiter = ',') 
-            for row in data: 
-                sync = float((row[1]))
-                opt = float((row[3]))
-                imp = opt/sync
-                if imp < maxImp:
-                    maxImp = imp
-    return maxImp
+    df = loadResults(dataFolder, length)
+    return min(100000, (df['optPhasingLatency'] / df['synchronousLatency']).min())
 
 def getMinImprovementForChainLength(dataFolder, length) :
-    filename = dataFolder + "/length_" + str(length) + ".csv"
-    min = 0
-    with open(filename,'r') as csvfile: 
-            data = csv.reader(csvfile, delimiter = ',') 
-            for row in data: 
-                sync = float((row[1]))
-                opt = float((row[3]))
-                imp = opt/sync
-                if imp > min:
-                    min = imp
-    return min
+    df = loadResults(dataFolder, length)
+    return max(0, (df['optPhasingLatency'] / df['synchronousLatency']).max())
 
 def plot(dataFolder, dstFolder, start, stop, step):
     """ Create plotw for the files in the dataFolder. """
     
     print("Generating Plots for folder: " + dataFolder)
 
-    data = []
+    frames = []
     gap = False
     xOrder = []
     xTicksLabels = []
     gaps = []
 
     #['Worst-Case Phasing', length, float((row[7])), float((row[8]))])  
-    for length in range(start, stop+1, step):   # Read data from CSV files. 
+    for length in range(start, stop+1, step):   # Read data from result files. 
         tmp = readDataFrameIndividual(dataFolder, length)
         if tmp is not None:
             if gap is True:
@@ -296,11 +217,11 @@ def plot(dataFolder, dstFolder, start, stop, step):
             xOrder.append(length)
             xTicksLabels.append(str(length))
             gap = False
-            data.extend(tmp)
+            frames.append(tmp)
         else:
             gap = True
 
-    df = pd.DataFrame(data, columns=['Approach', 'Cause-Effect Chain Length', 'Latency [$H$]', 'Runtime [s]'])
+    df = pd.concat(frames, ignore_index=True)
 
     ######################################################################################################
     # BOXPLOT comparing end-to-end latency of different appraoches
@@ -372,15 +293,15 @@ def plot(dataFolder, dstFolder, start, stop, step):
     # BOXPLOT comparing ratio between latency of sync approach and optimal phasing (opt / sync)
     ######################################################################################################
 
-    data = []
+    frames = []
 
-    for length in range(start, stop+1, step):   # Read data from CSV files. 
+    for length in range(start, stop+1, step):   # Read data from result files. 
         tmp = readDataFrameRatio(dataFolder, length)
 
         if tmp is not None:
-            data.extend(tmp)
+            frames.append(tmp)
 
-    df = pd.DataFrame(data, columns=['Approach', 'Cause-Effect Chain Length', 'Optimal / Synchronous'])
+    df = pd.concat(frames, ignore_index=True)
 
     configure_mpl_for_tex()
 
@@ -419,16 +340,10 @@ def gen2kmaxPlot(dstPath, sourcePaths, minChainLength, maxChainLength, stepChain
 
         
         
-        for length in range(minChainLength, maxChainLength+1, stepChainLength):   # Read data from CSV files. 
+        for length in range(minChainLength, maxChainLength+1, stepChainLength):   # Read data from result files. 
 
-            filename = sourcePaths[i] + "/length_" + str(length) + ".csv"
-            opt = []
-            with open(filename,'r') as csvfile: 
-                data = csv.reader(csvfile, delimiter = ',') 
-                for row in data: 
-                    #opt.append(float((row[3])))
-                    opt.append(float((row[3])) / float((row[1])))
-            avrgOpt = geo_mean(opt)
+            df = loadResults(sourcePaths[i], length)
+            avrgOpt = geo_mean(df['optPhasingLatency'] / df['synchronousLatency'])
 
             graphData.append(['(2,'+str(kValueItems[i])+')-max-harmonic', avrgOpt, length])
 
@@ -452,7 +367,7 @@ def combineResults(destinationFolder, input) :
 
     paths = input.split(',')
     
-    # If the data folder exists, it and its content is deleted here. This is important as file merging appends to the new csv-files!
+    # If the data folder exists, it and its content is deleted here. This is important as file merging appends to the new result files!
     dataPath = os.path.join("output", destinationFolder, "data") 
     if os.path.isdir(dataPath):
         allfiles = [f for f in os.listdir(dataPath) if os.path.isfile(os.path.join(dataPath, f))]
@@ -479,16 +394,16 @@ def combineResults(destinationFolder, input) :
         
         for fileName in allfiles:
             srcFilePath = os.path.join(sourceDataPath, fileName)
-            dstFilePath = os.path.join(dataPath, fileName)
-            #print(srcFilePath + " -> " + dstFilePath) 
-
-            srcFile = open(srcFilePath, "r")
-            dstFile = open(dstFilePath, "a")
 
-            dstFile.write(srcFile.read())
+            if fileName.endswith(".schema"):        # Binary results are appended column by column
+                resultName = fileName[:-len(".schema")]
+                appendResults(os.path.join(sourceDataPath, resultName), os.path.join(dataPath, resultName))
+            elif fileName.endswith(".csv"):         # Results of older experiments are converted, so all rows of a chain length are in one place
+                resultName = fileName[:-len(".csv")]
+                if not os.path.isfile(getSchemaPath(os.path.join(sourceDataPath, resultName))):  # Otherwise already converted by the experiment
+                    convertCsvResults(srcFilePath, os.path.join(dataPath, resultName))
 
-            srcFile.close()
-            dstFile.close()
+            # Other files are the columns and checkpoints of binary results (checkpoints belong to the individual experiments)
 
 
 if __name__ == '__main__':